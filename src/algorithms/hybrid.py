@@ -1,9 +1,12 @@
+import base64
 import json
 import math
+import struct
 from abc import abstractmethod
 from collections import deque
 from datamodel import Listing, Observation, Order, OrderDepth, ProsperityEncoder, Symbol, Trade, TradingState
 from enum import IntEnum
+from operator import itemgetter
 from statistics import NormalDist
 from typing import Any, TypeAlias
 
@@ -15,35 +18,249 @@ JSON: TypeAlias = dict[str, "JSON"] | list["JSON"] | str | int | float | bool |
 RIHIANNAS = ["Rhianna", "Rihanna"]
 
 class Logger:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        delta: bool = False,
+        keyframe_interval: int = 100,
+        priorities: tuple[int, int, int] = (1, 1, 1),
+        sample_interval: int | None = 1,
+        on_position_change: bool = False,
+        on_print: bool = False,
+    ) -> None:
         self.logs = ""
         self.max_log_length = 3750
+        self.encoder = ProsperityEncoder(separators=(",", ":"))
+
+        # A tick is logged when any of the enabled conditions holds: it is every sample_interval-th tick,
+        # a position changed, logger.print was called, or request_flush was called (strategies do this on signal flips)
+        # Skipped ticks print nothing and skip all compression work, their logs are dropped
+        if sample_interval is not None and (type(sample_interval) is not int or sample_interval < 1):
+            raise ValueError(f"Log sample interval must be None or a positive integer, got {sample_interval!r}")
+
+        self.sample_interval = sample_interval
+        self.on_position_change = on_position_change
+        self.on_print = on_print
+        self.flush_requested = False
+        self.ticks = 0
+        self.last_position: dict[Symbol, int] = {}
+
+        # Relative shares of the log budget for state.traderData, trader_data and self.logs, see allocate
+        # A string with priority 0 only gets what the others leave unused
+        if any(priority < 0 for priority in priorities):
+            raise ValueError(f"Log budget priorities cannot be negative, got {priorities}")
+
+        self.priorities = priorities
+
+        # In delta mode each line only contains what changed since the previous line, see flush_delta
+        # These lines are not understood by the visualizer, they can be expanded to regular lines with the analysis decoder
+        self.delta = delta
+        self.keyframe_interval = keyframe_interval
+        self.flushes = 0
+        self.previous: dict[str, Any] | None = None
 
     def print(self, *objects: Any, sep: str = " ", end: str = "\n") -> None:
         self.logs += sep.join(map(str, objects)) + end
 
+    def request_flush(self) -> None:
+        self.flush_requested = True
+
+    def should_flush(self, state: TradingState) -> bool:
+        position_changed = state.position != self.last_position
+        self.last_position = state.position
+
+        return (
+            (self.sample_interval is not None and self.ticks % self.sample_interval == 0)
+            or (self.on_position_change and position_changed)
+            or (self.on_print and self.logs != "")
+            or self.flush_requested
+        )
+
     def flush(self, state: TradingState, orders: dict[Symbol, list[Order]], conversions: int, trader_data: str) -> None:
-        base_length = len(self.to_json([
+        flush = self.should_flush(state)
+        self.ticks += 1
+        self.flush_requested = False
+
+        if not flush:
+            self.logs = ""
+            return
+
+        if self.delta:
+            self.flush_delta(state, orders, conversions, trader_data)
+            self.logs = ""
+            return
+
+        # The payload is serialized once with empty strings, the truncated strings are spliced in afterwards
+        # The output is the same as serializing the payload again with the truncated strings in place
+        base = self.to_json([
             self.compress_state(state, ""),
             self.compress_orders(orders),
             conversions,
             "",
             "",
-        ]))
+        ])
 
-        # We truncate state.traderData, trader_data, and self.logs to the same max. length to fit the log limit
-        max_item_length = (self.max_log_length - base_length) // 3
+        # We truncate state.traderData, trader_data, and self.logs to fit the log limit
+        state_trader_data, trader_data, logs = self.fit(self.max_log_length - len(base), [state.traderData, trader_data, self.logs], self.priorities)
 
-        print(self.to_json([
-            self.compress_state(state, self.truncate(state.traderData, max_item_length)),
-            self.compress_orders(orders),
-            conversions,
-            self.truncate(trader_data, max_item_length),
-            self.truncate(self.logs, max_item_length),
+        # The base starts with [[timestamp,"" and ends with ,"",""]
+        state_trader_data_start = base.index(",") + 1
+
+        print("".join([
+            base[:state_trader_data_start],
+            state_trader_data,
+            base[state_trader_data_start + 2:-7],
+            ",",
+            trader_data,
+            ",",
+            logs,
+            "]",
         ]))
 
         self.logs = ""
 
+    def flush_delta(self, state: TradingState, orders: dict[Symbol, list[Order]], conversions: int, trader_data: str) -> None:
+        # Lines look like [delta, orders, conversions, state.traderData, trader_data, logs]
+        # delta is an object with the timestamp ("t"), the listings ("l", keyframes only), the changed book sides ("d"),
+        # the changed own and market trades per symbol ("o" and "m") with their symbol order when it changed ("os" and "ms"),
+        # the changed positions ("p") and the observations ("b")
+        # Unchanged book sides and removed symbols and positions are null
+        # state.traderData is null when it is the trader data of the previous line, which is the case unless the trader restarted
+        listings = self.compress_listings(state.listings)
+
+        # Keyframes contain everything, so a decoder can start from any keyframe
+        if self.previous is None or listings != self.previous["listings"] or self.flushes % self.keyframe_interval == 0:
+            self.previous = {"listings": listings, "order_depths": {}, "own_trades": {}, "market_trades": {}, "position": {}, "trader_data": None}
+            delta = {"t": state.timestamp, "l": listings}
+        else:
+            delta = {"t": state.timestamp}
+
+        self.flushes += 1
+
+        delta["d"] = self.diff_order_depths(state.order_depths)
+        for field, trades, key in [("o", state.own_trades, "own_trades"), ("m", state.market_trades, "market_trades")]:
+            delta[field], order = self.diff_trades(trades, key)
+            if order is not None:
+                delta[field + "s"] = order
+
+        delta["p"] = self.diff_values(state.position, self.previous["position"])
+        delta["b"] = self.compress_observations(state.observations)
+        self.previous["position"] = dict(state.position)
+
+        strings = [trader_data, self.logs]
+        priorities = list(self.priorities[1:])
+        if state.traderData != self.previous["trader_data"]:
+            strings.insert(0, state.traderData)
+            priorities.insert(0, self.priorities[0])
+
+        self.previous["trader_data"] = trader_data
+
+        # Unchanged trader data leaves its share of the budget to the other strings
+        base = self.to_json([delta, self.compress_orders(orders), conversions])[:-1]
+        empty_strings = ',""' * len(strings) + ("" if len(strings) == 3 else ",null")
+        encoded = self.fit(self.max_log_length - len(base) - len(empty_strings) - 1, strings, priorities)
+        if len(strings) == 2:
+            encoded.insert(0, "null")
+
+        print(base + "," + ",".join(encoded) + "]")
+
+    def fit(self, budget: int, values: list[str], priorities: list[int]) -> list[str]:
+        # Returns the JSON encoded values, truncated so that together they take at most budget characters besides their quotes
+        # The budget is split on encoded lengths, since quotes and newlines take more space once escaped
+        encoded = [self.to_json(value) for value in values]
+        limits = self.allocate(budget, [len(value) - 2 for value in encoded], priorities)
+
+        return [self.truncate_encoded(value, value_encoded, limit) for value, value_encoded, limit in zip(values, encoded, limits)]
+
+    def truncate_encoded(self, value: str, encoded: str, max_length: int) -> str:
+        if len(encoded) - 2 <= max_length:
+            return encoded
+
+        # Every character that is cut saves at least one encoded character, so this takes few iterations, and only one without escapes
+        length = max_length
+        while True:
+            encoded = self.to_json(self.truncate(value, max(length, 3)))
+
+            overshoot = len(encoded) - 2 - max_length
+            if overshoot <= 0 or length <= 3:
+                return encoded
+
+            length -= overshoot
+
+    def allocate(self, budget: int, lengths: list[int], priorities: list[int]) -> list[int]:
+        # Splits the budget over the strings in proportion to their priorities, strings that need less than their share
+        # keep their full length and leave what they do not use to the others
+        # Strings with priority 0 come last and split what is left evenly
+        # There are at most three strings, so this takes constant time and nothing has to be serialized again
+        limits = [0] * len(lengths)
+        remaining_priority = sum(priorities)
+
+        order = sorted(range(len(lengths)), key=lambda i: (1, lengths[i]) if priorities[i] == 0 else (0, lengths[i] / priorities[i]))
+        for n, i in enumerate(order):
+            if remaining_priority > 0:
+                share = budget * priorities[i] // remaining_priority
+            else:
+                share = budget // (len(order) - n)
+
+            limits[i] = min(lengths[i], share)
+            budget -= limits[i]
+            remaining_priority -= priorities[i]
+
+        return limits
+
+    def diff_order_depths(self, order_depths: dict[Symbol, OrderDepth]) -> dict[Symbol, list[dict[int, int] | None] | None]:
+        # Book sides have at most a few levels, so a changed side is sent as a whole and an unchanged side is null
+        previous = self.previous["order_depths"]
+
+        changes = {}
+        for symbol, order_depth in order_depths.items():
+            previous_sides = previous.get(symbol)
+            if previous_sides is None:
+                changes[symbol] = [order_depth.buy_orders, order_depth.sell_orders]
+                continue
+
+            buy_orders = order_depth.buy_orders if order_depth.buy_orders != previous_sides[0] else None
+            sell_orders = order_depth.sell_orders if order_depth.sell_orders != previous_sides[1] else None
+            if buy_orders is not None or sell_orders is not None:
+                changes[symbol] = [buy_orders, sell_orders]
+
+        for symbol in previous:
+            if symbol not in order_depths:
+                changes[symbol] = None
+
+        # The exchange sends new dicts every tick, so keeping references is enough to compare against the next tick
+        self.previous["order_depths"] = {symbol: (order_depth.buy_orders, order_depth.sell_orders) for symbol, order_depth in order_depths.items()}
+        return changes
+
+    def diff_trades(self, trades: dict[Symbol, list[Trade]], key: str) -> tuple[dict[Symbol, list[list[Any]] | None], list[Symbol] | None]:
+        # The exchange repeats the trades of a symbol on every tick until new ones happen, so only replaced lists are sent
+        # The trades are flattened in symbol order, a decoder appends new symbols to the ones it kept,
+        # so the symbol order is only sent when that does not reproduce the exchange's order
+        current = {
+            symbol: [[trade.symbol, trade.price, trade.quantity, trade.buyer, trade.seller, trade.timestamp] for trade in arr]
+            for symbol, arr in trades.items()
+        }
+
+        previous = self.previous[key]
+        changes = self.diff_values(current, previous)
+
+        order = list(current)
+        if order == list(previous) or order == [symbol for symbol in previous if symbol in current] + [symbol for symbol in current if symbol not in previous]:
+            order = None
+
+        self.previous[key] = current
+        return changes, order
+
+    def diff_values(self, current: dict[Any, Any], previous: dict[Any, Any]) -> dict[Any, Any]:
+        if current == previous:
+            return {}
+
+        changes = {key: value for key, value in current.items() if previous.get(key) != value}
+        for key in previous:
+            if key not in current:
+                changes[key] = None
+
+        return changes
+
     def compress_state(self, state: TradingState, trader_data: str) -> list[Any]:
         return [
             state.timestamp,
@@ -109,7 +326,7 @@ class Logger:
         return compressed
 
     def to_json(self, value: Any) -> str:
-        return json.dumps(value, cls=ProsperityEncoder, separators=(",", ":"))
+        return self.encoder.encode(value)
 
     def truncate(self, value: str, max_length: int) -> str:
         if len(value) <= max_length:
@@ -119,6 +336,106 @@ class Logger:
 
 logger = Logger()
 
+class OrderBook:
+    # Sorted view on an OrderDepth, the levels are derived when the book is created and again when refresh() is called
+    # A new OrderDepth arrives every tick, so a book only has to be refreshed when its depth is mutated in place
+    # Books have at most a few levels per side, so deriving them all at once is cheaper than lazy properties
+    def __init__(self, order_depth: OrderDepth) -> None:
+        self.order_depth = order_depth
+        self.refresh()
+
+    def refresh(self) -> None:
+        self.buy_orders = sorted(self.order_depth.buy_orders.items(), reverse=True)
+        self.sell_orders = sorted(self.order_depth.sell_orders.items())
+
+        self.total_buy_volume = sum(self.order_depth.buy_orders.values())
+        self.total_sell_volume = -sum(self.order_depth.sell_orders.values())
+
+        self.best_bid = self.buy_orders[0][0] if self.buy_orders else None
+        self.best_ask = self.sell_orders[0][0] if self.sell_orders else None
+
+        self.popular_buy_price = max(self.buy_orders, key=itemgetter(1))[0] if self.buy_orders else None
+        self.popular_sell_price = min(self.sell_orders, key=itemgetter(1))[0] if self.sell_orders else None
+
+        if self.popular_buy_price is not None and self.popular_sell_price is not None:
+            self.mid_price = (self.popular_buy_price + self.popular_sell_price) / 2
+        else:
+            self.mid_price = None
+
+class TradeIndex:
+    # Market trades keyed by (timestamp, buyer, seller) per symbol, so counterparty checks are dict lookups instead of scans
+    # Symbols are indexed on first use, most strategies never look at market trades
+    def __init__(self, market_trades: dict[Symbol, list[Trade]]) -> None:
+        self.market_trades = market_trades
+        self.trades: dict[Symbol, dict[tuple[int, str, str], list[tuple[int, Trade]]]] = {}
+
+    def get_symbol_index(self, symbol: Symbol) -> dict[tuple[int, str, str], list[tuple[int, Trade]]]:
+        index = self.trades.get(symbol)
+        if index is None:
+            index = {}
+            for i, trade in enumerate(self.market_trades.get(symbol, [])):
+                index.setdefault((trade.timestamp, trade.buyer, trade.seller), []).append((i, trade))
+
+            self.trades[symbol] = index
+
+        return index
+
+    def contains(self, symbol: Symbol, timestamp: int, buyer: str, seller: str) -> bool:
+        return (timestamp, buyer, seller) in self.get_symbol_index(symbol)
+
+    def find(self, symbol: Symbol, timestamp: int, pairs: list[tuple[str, str]]) -> list[Trade]:
+        # Trades matching any of the (buyer, seller) pairs, in the order they appear in state.market_trades
+        index = self.get_symbol_index(symbol)
+
+        matches = []
+        for buyer, seller in pairs:
+            matches.extend(index.get((timestamp, buyer, seller), []))
+
+        return [trade for _, trade in sorted(matches, key=lambda tup: tup[0])]
+
+class MarketSnapshot:
+    # Values derived from a single TradingState, each one is computed at most once per tick and shared by all strategies
+    def __init__(self, state: TradingState) -> None:
+        self.state = state
+
+        self.order_books: dict[Symbol, OrderBook] = {}
+        self.mid_prices: dict[Symbol, float] = {}
+        self.basket_spread: float | None = None
+        self.trade_index: TradeIndex | None = None
+
+    def get_order_book(self, symbol: Symbol) -> OrderBook:
+        book = self.order_books.get(symbol)
+        if book is None:
+            book = OrderBook(self.state.order_depths[symbol])
+            self.order_books[symbol] = book
+
+        return book
+
+    def get_mid_price(self, symbol: Symbol) -> float:
+        mid_price = self.mid_prices.get(symbol)
+        if mid_price is None:
+            mid_price = self.get_order_book(symbol).mid_price
+            self.mid_prices[symbol] = mid_price
+
+        return mid_price
+
+    def get_spread(self, symbol: Symbol) -> int:
+        book = self.get_order_book(symbol)
+        return book.best_ask - book.best_bid
+
+    def get_trade_index(self) -> TradeIndex:
+        if self.trade_index is None:
+            self.trade_index = TradeIndex(self.state.market_trades)
+
+        return self.trade_index
+
+    def get_basket_spread(self) -> float:
+        # Price of a gift basket minus the price of its contents
+        if self.basket_spread is None:
+            self.basket_spread = self.get_mid_price("GIFT_BASKET") - 4 * self.get_mid_price("CHOCOLATE") - 6 * self.get_mid_price("STRAWBERRIES") - self.get_mid_price("ROSES")
+
+        return self.basket_spread
+
 class Strategy:
     def __init__(self, symbol: str, limit: int) -> None:
         self.symbol = symbol
@@ -128,9 +445,10 @@ class Strategy:
     def act(self, state: TradingState) -> None:
         raise NotImplementedError()
 
-    def run(self, state: TradingState) -> tuple[list[Order], int]:
+    def run(self, state: TradingState, snapshot: MarketSnapshot) -> tuple[list[Order], int]:
         self.orders = []
         self.conversions = 0
+        self.snapshot = snapshot
 
         self.act(state)
 
@@ -146,14 +464,7 @@ class Strategy:
         self.conversions += amount
 
     def get_mid_price(self, state: TradingState, symbol: str) -> float:
-        order_depth = state.order_depths[symbol]
-        buy_orders = sorted(order_depth.buy_orders.items(), reverse=True)
-        sell_orders = sorted(order_depth.sell_orders.items())
-
-        popular_buy_price = max(buy_orders, key=lambda tup: tup[1])[0]
-        popular_sell_price = min(sell_orders, key=lambda tup: tup[1])[0]
-
-        return (popular_buy_price + popular_sell_price) / 2
+        return self.snapshot.get_mid_price(symbol)
 
     def save(self) -> JSON:
         return None
@@ -179,26 +490,29 @@ class SignalStrategy(Strategy):
     def act(self, state: TradingState) -> None:
         new_signal = self.get_signal(state)
         if new_signal is not None:
+            if new_signal != self.signal:
+                logger.request_flush()
+
             self.signal = new_signal
 
         position = state.position.get(self.symbol, 0)
-        order_depth = state.order_depths[self.symbol]
+        book = self.snapshot.get_order_book(self.symbol)
 
         if self.signal == Signal.NEUTRAL:
             if position < 0:
-                self.buy(self.get_buy_price(order_depth), -position)
+                self.buy(self.get_buy_price(book), -position)
             elif position > 0:
-                self.sell(self.get_sell_price(order_depth), position)
+                self.sell(self.get_sell_price(book), position)
         elif self.signal == Signal.SHORT:
-            self.sell(self.get_sell_price(order_depth), self.limit + position)
+            self.sell(self.get_sell_price(book), self.limit + position)
         elif self.signal == Signal.LONG:
-            self.buy(self.get_buy_price(order_depth), self.limit - position)
+            self.buy(self.get_buy_price(book), self.limit - position)
 
-    def get_buy_price(self, order_depth: OrderDepth) -> int:
-        return min(order_depth.sell_orders.keys())
+    def get_buy_price(self, book: OrderBook) -> int:
+        return book.best_ask
 
-    def get_sell_price(self, order_depth: OrderDepth) -> int:
-        return max(order_depth.buy_orders.keys())
+    def get_sell_price(self, book: OrderBook) -> int:
+        return book.best_bid
 
     def save(self) -> JSON:
         return self.signal.value
@@ -220,9 +534,7 @@ class MarketMakingStrategy(Strategy):
     def act(self, state: TradingState) -> None:
         true_value = self.get_true_value(state)
 
-        order_depth = state.order_depths[self.symbol]
-        buy_orders = sorted(order_depth.buy_orders.items(), reverse=True)
-        sell_orders = sorted(order_depth.sell_orders.items())
+        book = self.snapshot.get_order_book(self.symbol)
 
         position = state.position.get(self.symbol, 0)
         to_buy = self.limit - position
@@ -238,7 +550,7 @@ class MarketMakingStrategy(Strategy):
         max_buy_price = true_value - 1 if position > self.limit * 0.5 else true_value
         min_sell_price = true_value + 1 if position < self.limit * -0.5 else true_value
 
-        for price, volume in sell_orders:
+        for price, volume in book.sell_orders:
             if to_buy > 0 and price <= max_buy_price:
                 quantity = min(to_buy, -volume)
                 self.buy(price, quantity)
@@ -255,11 +567,10 @@ class MarketMakingStrategy(Strategy):
             to_buy -= quantity
 
         if to_buy > 0:
-            popular_buy_price = max(buy_orders, key=lambda tup: tup[1])[0]
-            price = min(max_buy_price, popular_buy_price + 1)
+            price = min(max_buy_price, book.popular_buy_price + 1)
             self.buy(price, to_buy)
 
-        for price, volume in buy_orders:
+        for price, volume in book.buy_orders:
             if to_sell > 0 and price >= min_sell_price:
                 quantity = min(to_sell, volume)
                 self.sell(price, quantity)
@@ -276,8 +587,7 @@ class MarketMakingStrategy(Strategy):
             to_sell -= quantity
 
         if to_sell > 0:
-            popular_sell_price = min(sell_orders, key=lambda tup: tup[1])[0]
-            price = max(min_sell_price, popular_sell_price - 1)
+            price = max(min_sell_price, book.popular_sell_price - 1)
             self.sell(price, to_sell)
 
     def save(self) -> JSON:
@@ -308,24 +618,22 @@ class OrchidsStrategy(Strategy):
 
 class ChocolateStrategy(SignalStrategy):
     def get_signal(self, state: TradingState) -> Signal | None:
-        trades = state.market_trades.get(self.symbol, [])
-        trades = [t for t in trades if t.timestamp == state.timestamp - 100]
+        trade_index = self.snapshot.get_trade_index()
 
-        if any(t.buyer == "Vladimir" and t.seller == "Remy" for t in trades):
+        if trade_index.contains(self.symbol, state.timestamp - 100, "Vladimir", "Remy"):
             return Signal.LONG
 
-        if any(t.buyer == "Remy" and t.seller == "Vladimir" for t in trades):
+        if trade_index.contains(self.symbol, state.timestamp - 100, "Remy", "Vladimir"):
             return Signal.SHORT
 
 class RosesStrategy(SignalStrategy):
     def get_signal(self, state: TradingState) -> Signal | None:
-        trades = state.market_trades.get(self.symbol, [])
-        trades = [t for t in trades if t.timestamp == state.timestamp - 100]
+        trade_index = self.snapshot.get_trade_index()
 
-        if any(t.buyer in RIHIANNAS and t.seller == "Vinnie" for t in trades):
+        if any(trade_index.contains(self.symbol, state.timestamp - 100, rihianna, "Vinnie") for rihianna in RIHIANNAS):
             return Signal.LONG
 
-        if any(t.buyer == "Vinnie" and t.seller in RIHIANNAS for t in trades):
+        if any(trade_index.contains(self.symbol, state.timestamp - 100, "Vinnie", rihianna) for rihianna in RIHIANNAS):
             return Signal.SHORT
 
 class GiftBasketStrategy(SignalStrategy):
@@ -333,12 +641,7 @@ class GiftBasketStrategy(SignalStrategy):
         if any(symbol not in state.order_depths for symbol in ["CHOCOLATE", "STRAWBERRIES", "ROSES", "GIFT_BASKET"]):
             return
 
-        chocolate = self.get_mid_price(state, "CHOCOLATE")
-        strawberries = self.get_mid_price(state, "STRAWBERRIES")
-        roses = self.get_mid_price(state, "ROSES")
-        gift_basket = self.get_mid_price(state, "GIFT_BASKET")
-
-        diff = gift_basket - 4 * chocolate - 6 * strawberries - roses
+        diff = self.snapshot.get_basket_spread()
 
         # if diff < 260:
         #     return Signal.LONG
@@ -382,9 +685,8 @@ class CoconutStrategy(SignalStrategy):
         self.last_price = None
 
     def get_signal(self, state: TradingState) -> Signal | None:
-        trades = state.market_trades.get(self.symbol, [])
-        trades = [t for t in trades if t.timestamp == state.timestamp - 100]
-        trades = [t for t in trades if (t.buyer == "Vinnie" and t.seller in RIHIANNAS) or (t.buyer in RIHIANNAS and t.seller == "Vinnie")]
+        pairs = [("Vinnie", rihianna) for rihianna in RIHIANNAS] + [(rihianna, "Vinnie") for rihianna in RIHIANNAS]
+        trades = self.snapshot.get_trade_index().find(self.symbol, state.timestamp - 100, pairs)
         if len(trades) == 0:
             return
 
@@ -408,6 +710,10 @@ class CoconutCouponStrategy(SignalStrategy):
 
         self.cdf = NormalDist().cdf
 
+        # Strike, expiration and volatility are fixed, so the expected price only depends on the COCONUT mid price
+        # Mid prices are multiples of 0.5 within a narrow range, so each one is priced once and then looked up
+        self.expected_prices: dict[float, float] = {}
+
     def get_signal(self, state: TradingState) -> Signal | None:
         if "COCONUT" not in state.order_depths or len(state.order_depths["COCONUT"].buy_orders) == 0 or len(state.order_depths["COCONUT"].sell_orders) == 0:
             return
@@ -426,7 +732,11 @@ class CoconutCouponStrategy(SignalStrategy):
         # Sigma is set so that the Black-Scholes value matches the initial coupon price at day 1 timestamp 0
         volatility = 0.193785
 
-        expected_price = self.black_scholes(asset_price, strike_price, expiration_time, risk_free_rate, volatility)
+        expected_price = self.expected_prices.get(asset_price)
+        if expected_price is None:
+            expected_price = self.black_scholes(asset_price, strike_price, expiration_time, risk_free_rate, volatility)
+            self.expected_prices[asset_price] = expected_price
+
         if coup > expected_price + 2:
             return Signal.SHORT
         elif coup < expected_price - 2:
@@ -444,6 +754,113 @@ class CoconutCouponStrategy(SignalStrategy):
         d2 = d1 - volatility * math.sqrt(expiration_time)
         return asset_price * self.cdf(d1) - strike_price * math.exp(-risk_free_rate * expiration_time) * self.cdf(d2)
 
+class TraderDataCodec:
+    @abstractmethod
+    def encode(self, data: dict[Symbol, JSON]) -> str:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def decode(self, trader_data: str) -> dict[Symbol, JSON]:
+        raise NotImplementedError()
+
+class JsonCodec(TraderDataCodec):
+    def encode(self, data: dict[Symbol, JSON]) -> str:
+        return json.dumps(data, separators=(",", ":"))
+
+    def decode(self, trader_data: str) -> dict[Symbol, JSON]:
+        return json.loads(trader_data) if trader_data != "" else {}
+
+class BinaryCodec(TraderDataCodec):
+    # The saved values are stored in the order of the given symbols, each as a type byte followed by the value, base64 encoded
+    # Boolean lists like the market making windows are bit-packed and small integers like signals take a single byte,
+    # anything else falls back to JSON
+    # The values are only identified by their position, so the buffer starts with the number of symbols it was written for
+    # Symbols without a saved value are tagged as missing and left out when decoding, like JsonCodec leaves out absent keys
+    NONE = 0
+    SMALL_INT = 1
+    BOOLS = 2
+    JSON_VALUE = 3
+    MISSING = 4
+
+    def __init__(self, symbols: list[Symbol]) -> None:
+        if len(symbols) > 255:
+            raise ValueError(f"BinaryCodec supports at most 255 symbols, got {len(symbols)}")
+
+        self.symbols = symbols
+        self.json_codec = JsonCodec()
+
+    def encode(self, data: dict[Symbol, JSON]) -> str:
+        buffer = bytearray([len(self.symbols)])
+
+        for symbol in self.symbols:
+            if symbol not in data:
+                buffer.append(self.MISSING)
+                continue
+
+            value = data[symbol]
+
+            if value is None:
+                buffer.append(self.NONE)
+            elif type(value) is int and -128 <= value < 128:
+                buffer.append(self.SMALL_INT)
+                buffer += struct.pack("<b", value)
+            elif type(value) is list and len(value) < 256 and all(type(item) is bool for item in value):
+                bits = 0
+                for i, item in enumerate(value):
+                    if item:
+                        bits |= 1 << i
+
+                buffer.append(self.BOOLS)
+                buffer.append(len(value))
+                buffer += bits.to_bytes((len(value) + 7) // 8, "little")
+            else:
+                encoded = json.dumps(value, separators=(",", ":")).encode("utf-8")
+                buffer.append(self.JSON_VALUE)
+                buffer += struct.pack("<H", len(encoded))
+                buffer += encoded
+
+        return base64.b64encode(buffer).decode("ascii")
+
+    def decode(self, trader_data: str) -> dict[Symbol, JSON]:
+        if trader_data == "":
+            return {}
+
+        # Trader data written by JsonCodec, like in all earlier submission logs, is a JSON object, base64 never contains "{"
+        if trader_data.startswith("{"):
+            return self.json_codec.decode(trader_data)
+
+        buffer = base64.b64decode(trader_data)
+        if buffer[0] != len(self.symbols):
+            raise ValueError(f"Trader data was written for {buffer[0]} symbols, expected {len(self.symbols)}")
+
+        offset = 1
+
+        data = {}
+        for symbol in self.symbols:
+            value_type = buffer[offset]
+            offset += 1
+
+            if value_type == self.MISSING:
+                continue
+            elif value_type == self.NONE:
+                data[symbol] = None
+            elif value_type == self.SMALL_INT:
+                data[symbol] = struct.unpack_from("<b", buffer, offset)[0]
+                offset += 1
+            elif value_type == self.BOOLS:
+                length = buffer[offset]
+                byte_length = (length + 7) // 8
+                bits = int.from_bytes(buffer[offset + 1:offset + 1 + byte_length], "little")
+
+                data[symbol] = [bits & (1 << i) != 0 for i in range(length)]
+                offset += 1 + byte_length
+            else:
+                length = struct.unpack_from("<H", buffer, offset)[0]
+                data[symbol] = json.loads(buffer[offset + 2:offset + 2 + length])
+                offset += 2 + length
+
+        return data
+
 class Trader:
     def __init__(self) -> None:
         limits = {
@@ -470,25 +887,30 @@ class Trader:
             "COCONUT_COUPON": CoconutCouponStrategy,
         }.items()}
 
+        # The strategies' saved state is stored compactly, JsonCodec() gives the human-readable format of earlier submissions
+        self.codec: TraderDataCodec = BinaryCodec(list(self.strategies.keys()))
+
     def run(self, state: TradingState) -> tuple[dict[Symbol, list[Order]], int, str]:
         orders = {}
         conversions = 0
 
-        old_trader_data = json.loads(state.traderData) if state.traderData != "" else {}
+        old_trader_data = self.codec.decode(state.traderData)
         new_trader_data = {}
 
+        snapshot = MarketSnapshot(state)
+
         for symbol, strategy in self.strategies.items():
             if symbol in old_trader_data:
                 strategy.load(old_trader_data[symbol])
 
             if symbol in state.order_depths and len(state.order_depths[symbol].buy_orders) > 0 and len(state.order_depths[symbol].sell_orders) > 0:
-                strategy_orders, strategy_conversions = strategy.run(state)
+                strategy_orders, strategy_conversions = strategy.run(state, snapshot)
                 orders[symbol] = strategy_orders
                 conversions += strategy_conversions
 
             new_trader_data[symbol] = strategy.save()
 
-        trader_data = json.dumps(new_trader_data, separators=(",", ":"))
+        trader_data = self.codec.encode(new_trader_data)
 
         logger.flush(state, orders, conversions, trader_data)
         return orders, conversions, trader_data
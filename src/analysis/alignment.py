@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+from catalog import Catalog
+from data import get_prices
+
+# Round 6 contains the prices seen during submission runs, round 7 the prices of the end-of-round runs
+REPLAY_ROUNDS = [6, 7]
+
+LEVEL_COLUMNS = ["bid_price_1", "bid_volume_1", "ask_price_1", "ask_volume_1", "mid_price"]
+
+def find_original_day(round_num: int, day_num: int, catalog: Catalog | None = None) -> tuple[int, int] | None:
+    if catalog is None:
+        catalog = Catalog()
+
+    replay = get_prices(round_num, day_num)
+    products = set(replay["product"].unique())
+
+    # The day column inside a replay file holds the day number the data was taken from
+    source_day = int(replay["day"].iloc[0])
+
+    best_key = None
+    best_match_rate = 0.0
+    for key, entry in catalog.days.items():
+        if key[0] in REPLAY_ROUNDS or key[1] != source_day or len(products & set(entry.products)) == 0:
+            continue
+
+        aligned = align_days((round_num, day_num), key)
+        match_rate = (aligned["mid_price_replay"] == aligned["mid_price_original"]).mean()
+        if match_rate > best_match_rate:
+            best_key = key
+            best_match_rate = match_rate
+
+    # Unrelated days of the same products still match on ~30% of the ticks, because mid prices hover around the same values
+    return best_key if best_match_rate > 0.5 else None
+
+def align_days(replay: tuple[int, int], original: tuple[int, int]) -> pd.DataFrame:
+    replay_prices = get_prices(*replay)[["timestamp", "product", *LEVEL_COLUMNS]]
+    original_prices = get_prices(*original)[["timestamp", "product", *LEVEL_COLUMNS]]
+
+    return replay_prices.merge(original_prices, on=["product", "timestamp"], how="inner", suffixes=("_replay", "_original"))
+
+def compare_days(replay: tuple[int, int], original: tuple[int, int] | None = None) -> pd.DataFrame:
+    if original is None:
+        original = find_original_day(*replay)
+        if original is None:
+            raise ValueError(f"Cannot find the original data of round {replay[0]} day {replay[1]}")
+
+    aligned = align_days(replay, original)
+
+    mismatch = (aligned["mid_price_replay"] != aligned["mid_price_original"]).to_numpy()
+    first_mismatch = aligned.loc[mismatch].groupby("product")["timestamp"].min()
+
+    diffs = pd.DataFrame({"product": aligned["product"]})
+    for column in LEVEL_COLUMNS:
+        diffs[column] = (aligned[f"{column}_replay"] - aligned[f"{column}_original"]).abs()
+
+    report = diffs.groupby("product").agg(
+        rows=("mid_price", "size"),
+        **{f"mean_abs_diff_{column}": (column, "mean") for column in LEVEL_COLUMNS},
+        max_abs_diff_mid_price=("mid_price", "max"),
+    )
+
+    report["mid_price_match_rate"] = pd.Series(~mismatch).groupby(aligned["product"].to_numpy()).mean()
+    report["first_mismatch_timestamp"] = first_mismatch
+
+    # Replay days usually cover only the start of the original day, so regimes are compared over the overlapping window
+    replay_prices = get_prices(*replay)
+    original_prices = get_prices(*original)
+    original_prices = original_prices[original_prices["timestamp"].between(replay_prices["timestamp"].min(), replay_prices["timestamp"].max())]
+
+    return report.join(compare_regimes(replay_prices, original_prices))
+
+def get_regime_stats(prices: pd.DataFrame) -> pd.DataFrame:
+    prices = prices.sort_values(["product", "timestamp"], kind="stable")
+    returns = prices.groupby("product")["mid_price"].diff()
+
+    return pd.DataFrame({
+        "mean_mid_price": prices.groupby("product")["mid_price"].mean(),
+        "return_std": returns.groupby(prices["product"]).std(),
+        "mean_spread": (prices["ask_price_1"] - prices["bid_price_1"]).groupby(prices["product"]).mean(),
+        "mean_top_volume": (prices["bid_volume_1"] + prices["ask_volume_1"]).groupby(prices["product"]).mean(),
+    })
+
+def compare_regimes(replay_prices: pd.DataFrame, original_prices: pd.DataFrame, threshold: float = 0.25) -> pd.DataFrame:
+    replay_stats = get_regime_stats(replay_prices)
+    original_stats = get_regime_stats(original_prices)
+
+    report = replay_stats.join(original_stats, how="inner", lsuffix="_replay", rsuffix="_original")
+
+    # A regime shift is flagged when volatility, spread or depth differ by more than the threshold,
+    # or when the price level moved by more than 100 typical tick-to-tick moves
+    ratios = []
+    for column in ["return_std", "mean_spread", "mean_top_volume"]:
+        ratio = report[f"{column}_replay"] / report[f"{column}_original"]
+        report[f"{column}_ratio"] = ratio
+        ratios.append(np.abs(np.log(ratio.to_numpy(dtype=np.float64))) > np.log1p(threshold))
+
+    level_shift = np.abs(report["mean_mid_price_replay"] - report["mean_mid_price_original"]) > 100 * report["return_std_original"]
+    report["regime_shift"] = np.logical_or.reduce(ratios) | level_shift.to_numpy()
+
+    return report
+
+def compare_to_round(replay: tuple[int, int], round_num: int) -> pd.DataFrame:
+    # Compares a replay day to every day of an original round, for example round 7 data against the days a strategy was tuned on
+    replay_prices = get_prices(*replay)
+
+    day_nums = dict(Catalog().get_spec()).get(round_num)
+    if day_nums is None:
+        raise ValueError(f"Cannot find prices data for round {round_num}")
+
+    reports = []
+    for day_num in day_nums:
+        report = compare_regimes(replay_prices, get_prices(round_num, day_num))
+        report.insert(0, "day", day_num)
+        reports.append(report)
+
+    return pd.concat(reports)
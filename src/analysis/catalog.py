@@ -0,0 +1,157 @@
+import json
+import re
+from dataclasses import asdict, dataclass
+from data import DATA_ROOT, DaySpec, get_cache_file, write_cache_file
+from functools import cached_property
+from pathlib import Path
+from typing import BinaryIO
+
+FILE_PATTERN = re.compile(r"(prices|trades)_round_(-?\d+)_day_(-?\d+)(?:_(wn|nn))?")
+
+@dataclass
+class FileInfo:
+    rows: int
+    first_timestamp: int | None
+    last_timestamp: int | None
+
+    # Only known for prices files, every timestamp lists all products so the first one is enough
+    products: list[str] | None
+
+class DayEntry:
+    def __init__(self, round_num: int, day_num: int) -> None:
+        self.round_num = round_num
+        self.day_num = day_num
+
+        self.prices_file: Path | None = None
+        self.trades_files: dict[str, Path] = {}
+
+    @property
+    def trade_variants(self) -> list[str]:
+        return [variant for variant in ["wn", "nn"] if variant in self.trades_files]
+
+    @cached_property
+    def prices(self) -> FileInfo | None:
+        return get_file_info(self.prices_file) if self.prices_file is not None else None
+
+    @cached_property
+    def trades(self) -> dict[str, FileInfo]:
+        return {variant: get_file_info(self.trades_files[variant]) for variant in self.trade_variants}
+
+    @property
+    def products(self) -> list[str]:
+        return self.prices.products if self.prices is not None else []
+
+    @property
+    def timestamp_range(self) -> tuple[int, int] | None:
+        if self.prices is None or self.prices.first_timestamp is None:
+            return None
+
+        return self.prices.first_timestamp, self.prices.last_timestamp
+
+    def __repr__(self) -> str:
+        return f"DayEntry(round_num={self.round_num}, day_num={self.day_num}, trade_variants={self.trade_variants})"
+
+class Catalog:
+    def __init__(self, root: Path = DATA_ROOT) -> None:
+        self.root = root
+        self.days: dict[tuple[int, int], DayEntry] = {}
+
+        # Only file names are read here, file metadata is loaded lazily when first accessed
+        for file in sorted(root.glob("round*/*.csv")):
+            match = FILE_PATTERN.fullmatch(file.stem)
+            if match is None:
+                continue
+
+            kind, round_num, day_num, variant = match.groups()
+            key = (int(round_num), int(day_num))
+            if key not in self.days:
+                self.days[key] = DayEntry(*key)
+
+            if kind == "prices":
+                self.days[key].prices_file = file
+            else:
+                self.days[key].trades_files[variant] = file
+
+        self.days = dict(sorted(self.days.items()))
+
+    @property
+    def rounds(self) -> list[int]:
+        return sorted({round_num for round_num, _ in self.days})
+
+    def get(self, round_num: int, day_num: int) -> DayEntry:
+        if (round_num, day_num) not in self.days:
+            raise ValueError(f"Cannot find data for round {round_num} day {day_num}")
+
+        return self.days[(round_num, day_num)]
+
+    def get_spec(self, kind: str = "prices") -> DaySpec:
+        spec = {}
+        for (round_num, day_num), entry in self.days.items():
+            if (kind == "prices" and entry.prices_file is not None) or (kind == "trades" and len(entry.trades_files) > 0):
+                spec.setdefault(round_num, []).append(day_num)
+
+        return list(spec.items())
+
+    def get_total_rows(self, kind: str = "prices") -> int:
+        if kind == "prices":
+            return sum(entry.prices.rows for entry in self.days.values() if entry.prices is not None)
+
+        return sum(entry.trades[entry.trade_variants[0]].rows for entry in self.days.values() if len(entry.trade_variants) > 0)
+
+def get_file_info(file: Path) -> FileInfo:
+    cache_file = get_cache_file(file, "meta.json")
+    if cache_file.is_file():
+        return FileInfo(**json.loads(cache_file.read_text(encoding="utf-8")))
+
+    info = scan_file(file)
+    write_cache_file(cache_file, lambda f: f.write(json.dumps(asdict(info)).encode("utf-8")))
+    return info
+
+def scan_file(file: Path) -> FileInfo:
+    with file.open("rb") as fd:
+        header = fd.readline().decode("utf-8").strip().split(";")
+        timestamp_column = header.index("timestamp")
+        product_column = header.index("product") if "product" in header else None
+
+        first_row = fd.readline().decode("utf-8").strip().split(";")
+        first_timestamp = int(first_row[timestamp_column]) if first_row != [""] else None
+
+        # Products are collected from the rows of the first timestamp
+        products = None
+        if product_column is not None:
+            products = [first_row[product_column]] if first_timestamp is not None else []
+            for line in fd:
+                row = line.decode("utf-8").strip().split(";")
+                if int(row[timestamp_column]) != first_timestamp:
+                    break
+
+                products.append(row[product_column])
+
+        # Row counts come from counting newlines, which is much cheaper than parsing the rows
+        fd.seek(0)
+        rows = -1
+        last_byte = b""
+        while chunk := fd.read(1 << 20):
+            rows += chunk.count(b"\n")
+            last_byte = chunk[-1:]
+
+        if last_byte not in [b"\n", b""]:
+            rows += 1
+
+        last_timestamp = int(read_last_line(fd).split(";")[timestamp_column]) if rows > 0 else None
+
+    return FileInfo(max(rows, 0), first_timestamp, last_timestamp, sorted(products) if products is not None else None)
+
+def read_last_line(fd: BinaryIO) -> str:
+    fd.seek(0, 2)
+    size = fd.tell()
+
+    block_size = 1024
+    while True:
+        offset = max(0, size - block_size)
+        fd.seek(offset)
+        lines = fd.read(size - offset).rstrip(b"\r\n").split(b"\n")
+        if len(lines) > 1 or offset == 0:
+            return lines[-1].decode("utf-8")
+
+        block_size *= 2
@@ -1,15 +1,448 @@
+import csv
+import glob
+import hashlib
+import numpy as np
 import pandas as pd
+import re
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datamodel import OrderDepth, Symbol, Trade
+from functools import lru_cache
+from itertools import groupby
 from pathlib import Path
+from typing import BinaryIO, Callable, Iterator
 
 DATA_ROOT = Path(__file__).parent.parent.parent / "data"
+CACHE_ROOT = Path(__file__).parent.parent.parent / ".cache"
 
-def get_prices(round_num: int, day_num: int) -> pd.DataFrame:
-    return pd.read_csv(DATA_ROOT / f"round{round_num}" / f"prices_round_{round_num}_day_{day_num}.csv", sep=";")
+@dataclass
+class CacheEvent:
+    file: Path
+    hit: bool
+    seconds: float
 
-def get_trades(round_num: int, day_num: int) -> pd.DataFrame:
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    events: list[CacheEvent] = field(default_factory=list)
+
+    def record(self, file: Path, hit: bool, seconds: float) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        self.events.append(CacheEvent(file, hit, seconds))
+
+    def reset(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.events = []
+
+    def __str__(self) -> str:
+        hit_seconds = sum(event.seconds for event in self.events if event.hit)
+        miss_seconds = sum(event.seconds for event in self.events if not event.hit)
+        return f"{self.hits} hits ({hit_seconds:.3f}s), {self.misses} misses ({miss_seconds:.3f}s)"
+
+cache_stats = CacheStats()
+
+# Compact dtypes for the prices and trades files, missing book levels become <NA> instead of forcing float64
+PRICES_SCHEMA = {
+    "day": "int16",
+    "timestamp": "int32",
+    "product": "category",
+    **{f"{side}_price_{level}": "Int32" for side in ["bid", "ask"] for level in range(1, 4)},
+    **{f"{side}_volume_{level}": "Int16" for side in ["bid", "ask"] for level in range(1, 4)},
+    "mid_price": "float32",
+    "profit_and_loss": "float64",
+}
+
+TRADES_SCHEMA = {
+    "timestamp": "int32",
+    "buyer": "category",
+    "seller": "category",
+    "symbol": "category",
+    "currency": "category",
+    "price": "Int32",
+    "quantity": "int16",
+}
+
+def get_prices_file(round_num: int, day_num: int) -> Path:
+    return DATA_ROOT / f"round{round_num}" / f"prices_round_{round_num}_day_{day_num}.csv"
+
+def get_trades_file(round_num: int, day_num: int) -> Path:
     for suffix in ["wn", "nn"]:
         file = DATA_ROOT / f"round{round_num}" / f"trades_round_{round_num}_day_{day_num}_{suffix}.csv"
         if file.is_file():
-            return pd.read_csv(file, sep=";")
+            return file
 
     raise ValueError(f"Cannot find trades data for round {round_num} day {day_num}")
+
+def get_prices(round_num: int, day_num: int, compact: bool = False) -> pd.DataFrame:
+    df = read_csv(get_prices_file(round_num, day_num))
+    return apply_schema(df, PRICES_SCHEMA) if compact else df
+
+def get_trades(round_num: int, day_num: int, compact: bool = False) -> pd.DataFrame:
+    df = read_csv(get_trades_file(round_num, day_num))
+    return apply_schema(df, TRADES_SCHEMA) if compact else df
+
+@dataclass
+class ProductIndex:
+    products: list[str]
+
+    # Rows of product i in the original frame are order[offsets[i]:offsets[i + 1]], in timestamp order
+    order: np.ndarray
+    offsets: np.ndarray
+
+    def get_range(self, product: str) -> tuple[int, int]:
+        if product not in self.products:
+            raise ValueError(f"Unknown product: {product}")
+
+        i = self.products.index(product)
+        return int(self.offsets[i]), int(self.offsets[i + 1])
+
+@lru_cache(maxsize=16)
+def get_product_index(round_num: int, day_num: int) -> ProductIndex:
+    file = get_prices_file(round_num, day_num)
+    index_file = get_cache_file(file, "index.npz")
+
+    start = time.perf_counter()
+    hit = index_file.is_file()
+
+    if not hit:
+        index = build_product_index(read_csv(file))
+        write_cache_file(index_file, lambda f: np.savez(f, products=np.asarray(index.products, dtype=str), order=index.order, offsets=index.offsets))
+    else:
+        with np.load(index_file, allow_pickle=False) as data:
+            index = ProductIndex(data["products"].tolist(), data["order"], data["offsets"])
+
+    cache_stats.record(index_file, hit, time.perf_counter() - start)
+    return index
+
+def build_product_index(prices: pd.DataFrame) -> ProductIndex:
+    codes, products = pd.factorize(prices["product"], sort=True)
+
+    # A stable sort keeps each product's rows in their original timestamp order
+    order = np.argsort(codes, kind="stable").astype(np.int32)
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(products)))]).astype(np.int32)
+
+    return ProductIndex(list(products), order, offsets)
+
+@lru_cache(maxsize=16)
+def get_sorted_prices(round_num: int, day_num: int, compact: bool = False) -> pd.DataFrame:
+    # Cached and shared between callers, treat the returned frame and its slices as read-only
+    index = get_product_index(round_num, day_num)
+    return get_prices(round_num, day_num, compact).take(index.order)
+
+def get_product_prices(round_num: int, day_num: int, product: str, compact: bool = False) -> pd.DataFrame:
+    start, end = get_product_index(round_num, day_num).get_range(product)
+    return get_sorted_prices(round_num, day_num, compact).iloc[start:end]
+
+def apply_schema(df: pd.DataFrame, schema: dict[str, str]) -> pd.DataFrame:
+    columns = {}
+    for column in df.columns:
+        if column not in schema:
+            raise ValueError(f"Column {column} is not in the schema")
+
+        values = df[column]
+        dtype = schema[column]
+
+        if dtype == "category":
+            columns[column] = values.astype(dtype)
+            continue
+
+        # Conversions are strict, values that don't survive the round-trip to the compact dtype raise an error
+        original = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        try:
+            with np.errstate(invalid="ignore"):
+                compact_values = values.astype(dtype)
+        except (TypeError, ValueError):
+            compact_values = None
+
+        if compact_values is None or not np.array_equal(compact_values.to_numpy(dtype=np.float64, na_value=np.nan), original, equal_nan=True):
+            raise ValueError(f"Column {column} does not fit in {dtype}")
+
+        columns[column] = compact_values
+
+    return pd.DataFrame(columns)
+
+def get_memory_report(df: pd.DataFrame, compact_df: pd.DataFrame) -> pd.DataFrame:
+    report = pd.DataFrame({
+        "before_dtype": df.dtypes.astype(str),
+        "before_bytes": df.memory_usage(deep=True, index=False),
+        "after_dtype": compact_df.dtypes.astype(str),
+        "after_bytes": compact_df.memory_usage(deep=True, index=False),
+    })
+
+    report.loc["total"] = ["", report["before_bytes"].sum(), "", report["after_bytes"].sum()]
+    report["ratio"] = report["before_bytes"] / report["after_bytes"]
+    return report
+
+DaySpec = list[tuple[int, list[int]]]
+
+def load_days(spec: DaySpec | None = None, kind: str = "prices", compact: bool = False, processes: bool = False, max_workers: int | None = None) -> pd.DataFrame:
+    if kind not in ["prices", "trades"]:
+        raise ValueError(f"Unknown kind: {kind}")
+
+    if spec is None:
+        # The catalog is the one place that scans DATA_ROOT, it imports this module so it is imported here
+        from catalog import Catalog
+        spec = Catalog().get_spec(kind)
+
+    keys = [(round_num, day_num) for round_num, day_nums in spec for day_num in day_nums]
+    loader = get_prices if kind == "prices" else get_trades
+
+    # Threads work well on a warm cache, processes help when most files still need to be parsed
+    executor: Executor = ProcessPoolExecutor(max_workers) if processes else ThreadPoolExecutor(max_workers)
+    with executor:
+        frames = list(executor.map(loader, *zip(*keys), [compact] * len(keys))) if len(keys) > 0 else []
+
+    if len(frames) == 0:
+        return pd.DataFrame()
+
+    rounds = np.repeat([round_num for round_num, _ in keys], [len(frame) for frame in frames])
+    days = np.repeat([day_num for _, day_num in keys], [len(frame) for frame in frames])
+
+    if compact:
+        # Concatenating categoricals with different categories falls back to object dtype
+        for column, dtype in (PRICES_SCHEMA if kind == "prices" else TRADES_SCHEMA).items():
+            if dtype == "category":
+                categories = sorted(set().union(*[frame[column].cat.categories for frame in frames]))
+                for frame in frames:
+                    frame[column] = frame[column].cat.set_categories(categories)
+
+    df = pd.concat(frames, ignore_index=True)
+    df["round"] = pd.Categorical(rounds, categories=list(dict.fromkeys(round_num for round_num, _ in keys)))
+    df["day"] = pd.Categorical(days, categories=list(dict.fromkeys(day_num for _, day_num in keys)))
+
+    return df
+
+@dataclass
+class OrderBook:
+    timestamps: np.ndarray
+    products: list[str]
+
+    # int32 arrays indexed by (timestamp, product, side, level), side 0 is bids and side 1 is asks
+    # Ask volumes are positive like in the prices files, unlike the negative volumes in OrderDepth.sell_orders
+    prices: np.ndarray
+    volumes: np.ndarray
+
+    # Boolean array with the same shape as prices and volumes, marking which levels exist
+    mask: np.ndarray
+
+    def product_index(self, product: str) -> int:
+        return self.products.index(product)
+
+def get_order_book(round_num: int, day_num: int) -> OrderBook:
+    file = get_prices_file(round_num, day_num)
+
+    axes_file = get_cache_file(file, "book.npz")
+    levels_file = get_cache_file(file, "levels.npy")
+    mask_file = get_cache_file(file, "mask.npy")
+
+    start = time.perf_counter()
+    hit = axes_file.is_file() and levels_file.is_file() and mask_file.is_file()
+
+    if not hit:
+        timestamps, products, levels, mask = build_order_book(read_csv(file))
+
+        # The axes file is written last, its presence implies the tensors are complete
+        write_cache_file(levels_file, lambda f: np.save(f, levels))
+        write_cache_file(mask_file, lambda f: np.save(f, mask))
+        write_cache_file(axes_file, lambda f: np.savez(f, timestamps=timestamps, products=np.asarray(products, dtype=str)))
+
+    with np.load(axes_file, allow_pickle=False) as axes:
+        timestamps = axes["timestamps"]
+        products = axes["products"].tolist()
+
+    # Memory-mapped read-only, so every process reading the same day shares the same pages
+    levels = np.load(levels_file, mmap_mode="r")
+    mask = np.load(mask_file, mmap_mode="r")
+
+    cache_stats.record(levels_file, hit, time.perf_counter() - start)
+    return OrderBook(timestamps, products, levels[..., 0], levels[..., 1], mask)
+
+def build_order_book(prices: pd.DataFrame) -> tuple[np.ndarray, list[str], np.ndarray, np.ndarray]:
+    timestamps, timestamp_idx = np.unique(prices["timestamp"].to_numpy(), return_inverse=True)
+    products, product_idx = np.unique(prices["product"].to_numpy(dtype=str), return_inverse=True)
+
+    levels = np.zeros((len(timestamps), len(products), 2, 3, 2), dtype=np.int32)
+    mask = np.zeros((len(timestamps), len(products), 2, 3), dtype=bool)
+
+    for side, bid_ask in enumerate(["bid", "ask"]):
+        for level in range(3):
+            level_prices = prices[f"{bid_ask}_price_{level + 1}"].to_numpy(dtype=np.float64)
+            level_volumes = prices[f"{bid_ask}_volume_{level + 1}"].to_numpy(dtype=np.float64)
+            valid = ~np.isnan(level_prices)
+
+            levels[timestamp_idx, product_idx, side, level, 0] = np.where(valid, level_prices, 0)
+            levels[timestamp_idx, product_idx, side, level, 1] = np.where(valid, level_volumes, 0)
+            mask[timestamp_idx, product_idx, side, level] = valid
+
+    return timestamps, products.tolist(), levels, mask
+
+@dataclass
+class Tick:
+    timestamp: int
+    order_depths: dict[Symbol, OrderDepth]
+    trades: dict[Symbol, list[Trade]]
+
+def iter_ticks(round_num: int, day_num: int) -> Iterator[Tick]:
+    try:
+        trades_file = get_trades_file(round_num, day_num)
+    except ValueError:
+        # Rounds 6 and 7 only contain prices data
+        trades_file = None
+
+    with get_prices_file(round_num, day_num).open("r", encoding="utf-8", newline="") as prices_fd:
+        price_groups = groupby(iter_csv_rows(prices_fd), key=lambda row: int(row["timestamp"]))
+
+        if trades_file is None:
+            trade_groups = iter([])
+            yield from merge_tick_groups(price_groups, trade_groups)
+        else:
+            with trades_file.open("r", encoding="utf-8", newline="") as trades_fd:
+                trade_groups = groupby(iter_csv_rows(trades_fd), key=lambda row: int(row["timestamp"]))
+                yield from merge_tick_groups(price_groups, trade_groups)
+
+def iter_csv_rows(fd: Iterator[str]) -> Iterator[dict[str, str]]:
+    reader = csv.reader(fd, delimiter=";")
+    header = next(reader)
+
+    for row in reader:
+        yield dict(zip(header, row))
+
+def merge_tick_groups(price_groups: Iterator[tuple[int, Iterator[dict[str, str]]]], trade_groups: Iterator[tuple[int, Iterator[dict[str, str]]]]) -> Iterator[Tick]:
+    # Both files are sorted by timestamp, so only the rows of the current tick are held in memory
+    next_prices = next(price_groups, None)
+    next_trades = next(trade_groups, None)
+
+    while next_prices is not None or next_trades is not None:
+        timestamp = min(group[0] for group in [next_prices, next_trades] if group is not None)
+        tick = Tick(timestamp, {}, {})
+
+        if next_prices is not None and next_prices[0] == timestamp:
+            for row in next_prices[1]:
+                tick.order_depths[row["product"]] = parse_order_depth(row)
+
+            next_prices = next(price_groups, None)
+
+        if next_trades is not None and next_trades[0] == timestamp:
+            for row in next_trades[1]:
+                trade = parse_trade(row)
+                tick.trades.setdefault(trade.symbol, []).append(trade)
+
+            next_trades = next(trade_groups, None)
+
+        yield tick
+
+def parse_order_depth(row: dict[str, str]) -> OrderDepth:
+    order_depth = OrderDepth()
+
+    for level in range(1, 4):
+        bid_price = row[f"bid_price_{level}"]
+        if bid_price != "":
+            order_depth.buy_orders[int(bid_price)] = int(row[f"bid_volume_{level}"])
+
+        ask_price = row[f"ask_price_{level}"]
+        if ask_price != "":
+            order_depth.sell_orders[int(ask_price)] = -int(row[f"ask_volume_{level}"])
+
+    return order_depth
+
+def parse_trade(row: dict[str, str]) -> Trade:
+    # The _nn files have empty buyer and seller columns, these are kept as empty strings like in submission logs
+    return Trade(
+        row["symbol"],
+        int(float(row["price"])),
+        int(row["quantity"]),
+        row["buyer"],
+        row["seller"],
+        int(row["timestamp"]),
+    )
+
+def get_cache_file(file: Path, suffix: str) -> Path:
+    # Cache file names look like <stem>-<path digest>-<version digest>.<suffix>
+    # The path digest tells apart source files with the same stem, the version digest changes whenever the source file
+    # is replaced or modified, so stale entries are never read
+    path = str(file.resolve())
+    stat = file.stat()
+    path_digest = hashlib.sha1(path.encode("utf-8")).hexdigest()[:8]
+    version_digest = hashlib.sha1(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8")).hexdigest()[:16]
+    return CACHE_ROOT / f"{file.stem}-{path_digest}-{version_digest}.{suffix}"
+
+def read_csv(file: Path) -> pd.DataFrame:
+    start = time.perf_counter()
+
+    cache_file = get_cache_file(file, "npz")
+    if cache_file.is_file():
+        df = read_frame_cache(cache_file)
+        hit = True
+    else:
+        df = pd.read_csv(file, sep=";")
+        write_frame_cache(df, cache_file)
+        hit = False
+
+    cache_stats.record(file, hit, time.perf_counter() - start)
+    return df
+
+def read_frame_cache(cache_file: Path) -> pd.DataFrame:
+    columns = {}
+    with np.load(cache_file, allow_pickle=False) as data:
+        for key in data.files:
+            if key.endswith(".categories"):
+                continue
+
+            values = data[key]
+            if f"{key}.categories" in data.files:
+                # String columns are stored as codes into their unique values, with -1 marking missing values
+                categories = np.append(data[f"{key}.categories"].astype(object), np.nan)
+                values = categories[values]
+
+            columns[key] = values
+
+    return pd.DataFrame(columns)
+
+def write_frame_cache(df: pd.DataFrame, cache_file: Path) -> None:
+    arrays = {}
+    for column in df.columns:
+        values = df[column]
+        if values.dtype.kind in "iufb":
+            arrays[column] = values.to_numpy()
+            continue
+
+        codes, categories = pd.factorize(values)
+        arrays[column] = codes.astype(np.int32)
+        arrays[f"{column}.categories"] = np.asarray(categories, dtype=str)
+
+    write_cache_file(cache_file, lambda file: np.savez(file, **arrays))
+
+def write_cache_file(cache_file: Path, write: Callable[[BinaryIO], None]) -> None:
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+
+    # Entries for older versions of the same source file are removed, these only differ in their version digest
+    # Stems and suffixes may contain dashes and dots, so names are matched in full rather than split
+    prefix, suffix = re.fullmatch(r"(.*-[0-9a-f]{8}-)[0-9a-f]{16}\.(.+)", cache_file.name).groups()
+    pattern = re.compile(rf"{re.escape(prefix)}[0-9a-f]{{16}}\.{re.escape(suffix)}")
+    for old_file in cache_file.parent.glob(f"{glob.escape(prefix)}*"):
+        if old_file != cache_file and pattern.fullmatch(old_file.name):
+            old_file.unlink(missing_ok=True)
+
+    # Write to a temporary file first so concurrent readers never see a partially written cache entry
+    tmp_file = cache_file.with_name(f"{cache_file.name}.{time.time_ns()}.tmp")
+    with tmp_file.open("wb") as file:
+        write(file)
+
+    tmp_file.replace(cache_file)
+
+def prewarm_cache() -> CacheStats:
+    stats = CacheStats()
+    for file in sorted(DATA_ROOT.glob("round*/*.csv")):
+        start = time.perf_counter()
+        hit = get_cache_file(file, "npz").is_file()
+        read_csv(file)
+        stats.record(file, hit, time.perf_counter() - start)
+
+    return stats
@@ -0,0 +1,211 @@
+import json
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from logs import iter_sandbox_logs
+from operator import itemgetter
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Sequence
+
+TRADE_COLUMNS = {"tick": np.int32, "symbol": "category", "price": np.float64, "quantity": np.int32, "buyer": "category", "seller": "category", "timestamp": np.int32}
+
+OBSERVATION_COLUMNS = {
+    "tick": np.int32,
+    "product": "category",
+    "bidPrice": np.float64,
+    "askPrice": np.float64,
+    "transportFees": np.float64,
+    "exportTariff": np.float64,
+    "importTariff": np.float64,
+    "sunlight": np.float64,
+    "humidity": np.float64,
+}
+
+@dataclass
+class DecodedLog:
+    # One entry per logged tick, the tick column in every table below indexes into these arrays
+    timestamps: np.ndarray
+    conversions: np.ndarray
+    old_trader_data: np.ndarray
+    new_trader_data: np.ndarray
+    logs: np.ndarray
+
+    listings: pd.DataFrame
+
+    # Long format, one row per book level with side 0 for bids and side 1 for asks, ask volumes are negative
+    order_depths: pd.DataFrame
+
+    own_trades: pd.DataFrame
+    market_trades: pd.DataFrame
+    positions: pd.DataFrame
+    plain_observations: pd.DataFrame
+    conversion_observations: pd.DataFrame
+    orders: pd.DataFrame
+
+def decode_log(file: Path) -> DecodedLog:
+    return decode_lambda_logs([record.lambda_log for record in iter_sandbox_logs(file)])
+
+def decode_lambda_logs(lambda_logs: list[str]) -> DecodedLog:
+    # Parsing all payloads as one JSON array keeps the parsing itself in the C decoder
+    payloads = list(expand_delta_payloads(json.loads("[" + ",".join(log for log in lambda_logs if log.startswith("[")) + "]")))
+
+    # Every table is collected in a single pass over the payloads, as its rows in tick order plus the number of rows per tick
+    # Rows are the lists from the payloads themselves, so nothing is copied into tuples and transposed afterwards
+    listings = Rows()
+    own_trades = Rows()
+    market_trades = Rows()
+    positions = Rows()
+    plain_observations = Rows()
+    conversion_observations = Rows()
+    orders = Rows()
+
+    # Book levels are the bulk of the rows, their symbol and side are stored once per book side and repeated afterwards
+    depth_ticks = []
+    depth_counts = []
+    depth_symbols = []
+    depth_sides = []
+    depth_prices = []
+    depth_volumes = []
+
+    for tick, payload in enumerate(payloads):
+        state = payload[0]
+
+        listings.add(state[2])
+
+        for symbol, sides in state[3].items():
+            for side, levels in enumerate(sides):
+                depth_ticks.append(tick)
+                depth_counts.append(len(levels))
+                depth_symbols.append(symbol)
+                depth_sides.append(side)
+                depth_prices.extend(levels.keys())
+                depth_volumes.extend(levels.values())
+
+        own_trades.add(state[4])
+        market_trades.add(state[5])
+        positions.add(state[6].items())
+        plain_observations.add(state[7][0].items())
+        conversion_observations.add([[product, *values] for product, values in state[7][1].items()])
+        orders.add(payload[1])
+
+    depth_counts = np.array(depth_counts, dtype=np.int64)
+
+    return DecodedLog(
+        np.array([payload[0][0] for payload in payloads], dtype=np.int32),
+        np.array([payload[2] for payload in payloads], dtype=np.int32),
+        np.array([payload[0][1] for payload in payloads], dtype=object),
+        np.array([payload[3] for payload in payloads], dtype=object),
+        np.array([payload[4] for payload in payloads], dtype=object),
+        listings.to_frame({"tick": np.int32, "symbol": "category", "product": "category", "denomination": "category"}),
+        pd.DataFrame({
+            "tick": np.repeat(np.array(depth_ticks, dtype=np.int32), depth_counts),
+            "symbol": to_categorical(depth_symbols, depth_counts),
+            "side": np.repeat(np.array(depth_sides, dtype=np.int8), depth_counts),
+            # Prices are JSON object keys, int() parses them faster than numpy's string to integer conversion
+            "price": np.fromiter(map(int, depth_prices), dtype=np.int32, count=len(depth_prices)),
+            "volume": np.array(depth_volumes, dtype=np.int32),
+        }),
+        own_trades.to_frame(TRADE_COLUMNS),
+        market_trades.to_frame(TRADE_COLUMNS),
+        positions.to_frame({"tick": np.int32, "symbol": "category", "position": np.int32}),
+        plain_observations.to_frame({"tick": np.int32, "product": "category", "value": np.float64}),
+        conversion_observations.to_frame(OBSERVATION_COLUMNS),
+        orders.to_frame({"tick": np.int32, "symbol": "category", "price": np.int32, "quantity": np.int32}),
+    )
+
+def expand_delta_payloads(payloads: Iterable[list[Any]]) -> Iterator[list[Any]]:
+    # Rebuilds regular [state, orders, conversions, trader_data, logs] payloads from the lines of Logger's delta mode,
+    # regular payloads are passed through as-is
+    previous = None
+
+    for payload in payloads:
+        if not isinstance(payload[0], dict):
+            yield payload
+            continue
+
+        delta, orders, conversions, state_trader_data, trader_data, logs = payload
+
+        if "l" in delta:
+            previous = {"listings": delta["l"], "order_depths": {}, "own_trades": {}, "market_trades": {}, "position": {}, "trader_data": ""}
+        elif previous is None:
+            raise ValueError(f"Cannot expand the delta log line at timestamp {delta['t']} without a preceding keyframe")
+
+        for symbol, sides in delta["d"].items():
+            if sides is None:
+                previous["order_depths"].pop(symbol, None)
+                continue
+
+            # Unchanged sides are null
+            order_depth = previous["order_depths"].setdefault(symbol, [{}, {}])
+            for side, levels in enumerate(sides):
+                if levels is not None:
+                    order_depth[side] = levels
+
+        for key, changes in [("own_trades", delta["o"]), ("market_trades", delta["m"]), ("position", delta["p"])]:
+            for symbol, value in changes.items():
+                if value is None:
+                    previous[key].pop(symbol, None)
+                else:
+                    previous[key][symbol] = value
+
+        # New symbols are appended, the trades are reordered when that does not match the order the exchange sent them in
+        for key, field in [("own_trades", "os"), ("market_trades", "ms")]:
+            if field in delta:
+                previous[key] = {symbol: previous[key][symbol] for symbol in delta[field]}
+
+        if state_trader_data is None:
+            state_trader_data = previous["trader_data"]
+
+        previous["trader_data"] = trader_data
+
+        yield [
+            [
+                delta["t"],
+                state_trader_data,
+                previous["listings"],
+                {symbol: [dict(buy_orders), dict(sell_orders)] for symbol, (buy_orders, sell_orders) in previous["order_depths"].items()},
+                [trade for trades in previous["own_trades"].values() for trade in trades],
+                [trade for trades in previous["market_trades"].values() for trade in trades],
+                dict(previous["position"]),
+                delta["b"],
+            ],
+            orders,
+            conversions,
+            trader_data,
+            logs,
+        ]
+
+class Rows:
+    # The rows of one table in tick order, the tick column is expanded from the number of rows each tick added
+    def __init__(self) -> None:
+        self.counts: list[int] = []
+        self.rows: list[Sequence[Any]] = []
+
+    def add(self, rows: Iterable[Sequence[Any]]) -> None:
+        size = len(self.rows)
+        self.rows.extend(rows)
+        self.counts.append(len(self.rows) - size)
+
+    def to_frame(self, columns: dict[str, Any]) -> pd.DataFrame:
+        (tick_column, tick_dtype), *value_columns = columns.items()
+        frame = {tick_column: np.repeat(np.arange(len(self.counts), dtype=tick_dtype), self.counts)}
+
+        for i, (column, dtype) in enumerate(value_columns):
+            values = list(map(itemgetter(i), self.rows))
+            frame[column] = to_categorical(values) if dtype == "category" else np.array(values, dtype=dtype)
+
+        return pd.DataFrame(frame)
+
+def to_categorical(values: list[Any], repeats: np.ndarray | None = None) -> pd.Categorical:
+    # Columns have few distinct values, so they are mapped to integer codes through a dict instead of letting
+    # pd.Categorical hash every value, categories are sorted and missing values become -1 like pd.Categorical does it
+    # With repeats every value stands for that many consecutive rows
+    categories = sorted(value for value in set(values) if value is not None)
+    codes_by_value = {value: i for i, value in enumerate(categories)}
+    codes_by_value[None] = -1
+
+    codes = np.fromiter(map(codes_by_value.__getitem__, values), dtype=np.int32, count=len(values))
+    if repeats is not None:
+        codes = np.repeat(codes, repeats)
+
+    return pd.Categorical.from_codes(codes, categories)
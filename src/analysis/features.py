@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import time
+from dataclasses import dataclass
+from data import OrderBook, cache_stats, get_cache_file, get_order_book, get_prices_file, write_cache_file
+
+# Bump whenever a feature definition changes, cached features of older versions are then recomputed
+FEATURE_VERSION = 1
+
+PRODUCT_FEATURES = ["mid_price", "popular_mid_price", "spread", "imbalance"]
+
+GIFT_BASKET_WEIGHTS = {
+    "GIFT_BASKET": 1,
+    "CHOCOLATE": -4,
+    "STRAWBERRIES": -6,
+    "ROSES": -1,
+}
+
+@dataclass
+class Features:
+    timestamps: np.ndarray
+    products: list[str]
+
+    # float64 arrays indexed by (timestamp, product), NaN where a side of the book is empty
+    mid_price: np.ndarray
+    popular_mid_price: np.ndarray
+    spread: np.ndarray
+    imbalance: np.ndarray
+
+    # GIFT_BASKET - 4 * CHOCOLATE - 6 * STRAWBERRIES - ROSES on popular mid prices, NaN when not all are traded
+    gift_basket_spread: np.ndarray
+
+    def get_product(self, product: str) -> pd.DataFrame:
+        i = self.products.index(product)
+        return pd.DataFrame({"timestamp": self.timestamps, **{name: getattr(self, name)[:, i] for name in PRODUCT_FEATURES}})
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            "timestamp": np.repeat(self.timestamps, len(self.products)),
+            "product": np.tile(self.products, len(self.timestamps)),
+            **{name: getattr(self, name).ravel() for name in PRODUCT_FEATURES},
+        })
+
+def get_features(round_num: int, day_num: int) -> Features:
+    cache_file = get_cache_file(get_prices_file(round_num, day_num), f"features-v{FEATURE_VERSION}.npz")
+
+    start = time.perf_counter()
+    hit = cache_file.is_file()
+
+    if hit:
+        with np.load(cache_file, allow_pickle=False) as data:
+            features = Features(
+                data["timestamps"],
+                data["products"].tolist(),
+                *[data[name] for name in PRODUCT_FEATURES],
+                data["gift_basket_spread"],
+            )
+    else:
+        features = compute_features(get_order_book(round_num, day_num))
+        write_cache_file(cache_file, lambda f: np.savez(
+            f,
+            timestamps=features.timestamps,
+            products=np.asarray(features.products, dtype=str),
+            **{name: getattr(features, name) for name in PRODUCT_FEATURES},
+            gift_basket_spread=features.gift_basket_spread,
+        ))
+
+    cache_stats.record(cache_file, hit, time.perf_counter() - start)
+    return features
+
+def compute_features(book: OrderBook) -> Features:
+    prices = book.prices.astype(np.float64)
+    volumes = np.where(book.mask, book.volumes, 0)
+
+    # Level 1 is the best level, a side is empty when its best level is missing
+    has_side = book.mask[..., 0]
+    best_bid = np.where(has_side[..., 0], prices[..., 0, 0], np.nan)
+    best_ask = np.where(has_side[..., 1], prices[..., 1, 0], np.nan)
+
+    # Same as Strategy.get_mid_price: per side the price of the level with the highest volume, ties go to the best level
+    popular_level = np.argmax(np.where(book.mask, volumes, -1), axis=-1)
+    popular_prices = np.take_along_axis(prices, popular_level[..., np.newaxis], axis=-1)[..., 0]
+    popular_prices = np.where(has_side, popular_prices, np.nan)
+
+    bid_volume = volumes[..., 0, 0].astype(np.float64)
+    ask_volume = volumes[..., 1, 0].astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        imbalance = np.where(has_side[..., 0] & has_side[..., 1], (bid_volume - ask_volume) / (bid_volume + ask_volume), np.nan)
+
+    popular_mid_price = popular_prices.mean(axis=-1)
+
+    gift_basket_spread = np.full(len(book.timestamps), np.nan)
+    if all(product in book.products for product in GIFT_BASKET_WEIGHTS):
+        gift_basket_spread = sum(weight * popular_mid_price[:, book.product_index(product)] for product, weight in GIFT_BASKET_WEIGHTS.items())
+
+    return Features(
+        np.asarray(book.timestamps),
+        book.products,
+        (best_bid + best_ask) / 2,
+        popular_mid_price,
+        best_ask - best_bid,
+        imbalance,
+        gift_basket_spread,
+    )
@@ -0,0 +1,275 @@
+import io
+import json
+import numpy as np
+import pandas as pd
+import time
+from dataclasses import dataclass
+from data import cache_stats, get_cache_file, write_cache_file
+from pathlib import Path
+from typing import Iterator
+
+LOGS_ROOT = Path(__file__).parent.parent.parent / "logs"
+
+SANDBOX_SECTION = "Sandbox logs:"
+ACTIVITIES_SECTION = "Activities log:"
+TRADES_SECTION = "Trade History:"
+
+@dataclass
+class SandboxLogRecord:
+    timestamp: int
+    sandbox_log: str
+
+    # The raw output of Logger.flush, a compact positional JSON array
+    lambda_log: str
+
+@dataclass
+class ActivityRecord:
+    day: int
+    timestamp: int
+    product: str
+    bid_prices: list[int]
+    bid_volumes: list[int]
+    ask_prices: list[int]
+    ask_volumes: list[int]
+    mid_price: float
+    profit_and_loss: float
+
+@dataclass
+class TradeRecord:
+    timestamp: int
+    buyer: str
+    seller: str
+    symbol: str
+    currency: str
+    price: float
+    quantity: int
+
+LogRecord = SandboxLogRecord | ActivityRecord | TradeRecord
+
+def get_log_file(name: str) -> Path:
+    return LOGS_ROOT / f"{name}.log"
+
+def iter_log_records(file: Path, sections: tuple[str, ...] = (SANDBOX_SECTION, ACTIVITIES_SECTION, TRADES_SECTION)) -> Iterator[LogRecord]:
+    # Single pass over the file, only the lines of the current JSON object are kept in memory
+    # Lines of sections that are not requested are skipped without being parsed
+    section = None
+    header = None
+    object_lines = []
+
+    with file.open("r", encoding="utf-8") as fd:
+        for line in fd:
+            stripped = line.strip()
+
+            if stripped in [SANDBOX_SECTION, ACTIVITIES_SECTION, TRADES_SECTION]:
+                section = stripped if stripped in sections else None
+                header = None
+                continue
+
+            if section == ACTIVITIES_SECTION:
+                if stripped == "":
+                    continue
+
+                if header is None:
+                    header = stripped.split(";")
+                    continue
+
+                yield parse_activity(dict(zip(header, stripped.split(";"))))
+                continue
+
+            if section in [SANDBOX_SECTION, TRADES_SECTION]:
+                # Both sections contain pretty-printed objects, each key-value pair is on its own line
+                if stripped == "{":
+                    object_lines = [stripped]
+                elif len(object_lines) > 0:
+                    if stripped not in ["}", "},"]:
+                        object_lines.append(stripped)
+                    else:
+                        obj = json.loads("".join(object_lines) + "}")
+                        object_lines = []
+
+                        yield parse_sandbox_log(obj) if section == SANDBOX_SECTION else parse_trade(obj)
+
+def parse_sandbox_log(obj: dict) -> SandboxLogRecord:
+    return SandboxLogRecord(obj["timestamp"], obj["sandboxLog"], obj["lambdaLog"])
+
+def parse_activity(row: dict[str, str]) -> ActivityRecord:
+    levels = {}
+    for side in ["bid", "ask"]:
+        levels[f"{side}_prices"] = []
+        levels[f"{side}_volumes"] = []
+
+        for level in range(1, 4):
+            price = row[f"{side}_price_{level}"]
+            if price == "":
+                break
+
+            levels[f"{side}_prices"].append(int(price))
+            levels[f"{side}_volumes"].append(int(row[f"{side}_volume_{level}"]))
+
+    return ActivityRecord(
+        int(row["day"]),
+        int(row["timestamp"]),
+        row["product"],
+        **levels,
+        mid_price=float(row["mid_price"]),
+        profit_and_loss=float(row["profit_and_loss"]),
+    )
+
+def parse_trade(obj: dict) -> TradeRecord:
+    return TradeRecord(
+        obj["timestamp"],
+        obj["buyer"],
+        obj["seller"],
+        obj["symbol"],
+        obj["currency"],
+        obj["price"],
+        obj["quantity"],
+    )
+
+def iter_sandbox_logs(file: Path) -> Iterator[SandboxLogRecord]:
+    return iter_log_records(file, (SANDBOX_SECTION,))
+
+def iter_activities(file: Path) -> Iterator[ActivityRecord]:
+    return iter_log_records(file, (ACTIVITIES_SECTION,))
+
+def iter_trades(file: Path) -> Iterator[TradeRecord]:
+    return iter_log_records(file, (TRADES_SECTION,))
+
+def read_activities(file: Path) -> pd.DataFrame:
+    # The activities section is a plain CSV, so it is located through the index and parsed by pandas in one go
+    index = LogIndex(file)
+    if len(index.starts["activities"]) == 0:
+        return pd.DataFrame(columns=index.activities_header)
+
+    with file.open("rb") as fd:
+        start = index.starts["activities"].min()
+        fd.seek(start)
+        content = fd.read(index.ends["activities"].max() - start)
+
+    return pd.read_csv(io.BytesIO(content), sep=";", names=index.activities_header)
+
+@dataclass
+class LogTick:
+    timestamp: int
+    sandbox_logs: list[SandboxLogRecord]
+    activities: list[ActivityRecord]
+    trades: list[TradeRecord]
+
+class LogIndex:
+    SECTIONS = ["sandbox", "activities", "trades"]
+
+    def __init__(self, file: Path) -> None:
+        self.file = file
+
+        # Per section, the timestamp and [start, end) byte range of every record, sorted by timestamp
+        self.timestamps: dict[str, np.ndarray] = {}
+        self.starts: dict[str, np.ndarray] = {}
+        self.ends: dict[str, np.ndarray] = {}
+        self.activities_header: list[str] = []
+
+        # The index is cached by the log's path, size and mtime, so it is rebuilt whenever the log changes
+        index_file = get_cache_file(file, "logindex.npz")
+
+        start = time.perf_counter()
+        hit = index_file.is_file()
+
+        if hit:
+            with np.load(index_file, allow_pickle=False) as data:
+                for section in self.SECTIONS:
+                    self.timestamps[section] = data[f"{section}.timestamps"]
+                    self.starts[section] = data[f"{section}.starts"]
+                    self.ends[section] = data[f"{section}.ends"]
+
+                self.activities_header = data["activities.header"].tolist()
+        else:
+            self.build()
+            write_cache_file(index_file, lambda f: np.savez(f, **{
+                f"{section}.{name}": getattr(self, name)[section]
+                for section in self.SECTIONS
+                for name in ["timestamps", "starts", "ends"]
+            }, **{"activities.header": np.asarray(self.activities_header, dtype=str)}))
+
+        cache_stats.record(index_file, hit, time.perf_counter() - start)
+
+    def build(self) -> None:
+        records = {section: [] for section in self.SECTIONS}
+
+        section = None
+        header_seen = False
+        object_start = None
+        object_timestamp = None
+
+        offset = 0
+        with self.file.open("rb") as fd:
+            for line in fd:
+                line_start = offset
+                offset += len(line)
+                stripped = line.strip()
+
+                if stripped in [b"Sandbox logs:", b"Activities log:", b"Trade History:"]:
+                    section = {b"Sandbox logs:": "sandbox", b"Activities log:": "activities", b"Trade History:": "trades"}[stripped]
+                    header_seen = False
+                    continue
+
+                if section == "activities":
+                    if stripped == b"":
+                        continue
+
+                    if not header_seen:
+                        self.activities_header = stripped.decode("utf-8").split(";")
+                        header_seen = True
+                        continue
+
+                    # The timestamp is the second column, the row is only parsed when seeking
+                    records[section].append((int(stripped.split(b";", 2)[1]), line_start, offset))
+                elif section is not None:
+                    if stripped == b"{":
+                        object_start = line_start
+                        object_timestamp = None
+                    elif object_start is not None:
+                        if stripped.startswith(b'"timestamp":'):
+                            object_timestamp = int(stripped.split(b":", 1)[1].rstrip(b","))
+                        elif stripped in [b"}", b"},"]:
+                            records[section].append((object_timestamp, object_start, line_start + line.index(b"}") + 1))
+                            object_start = None
+
+        for section, section_records in records.items():
+            arr = np.array(section_records, dtype=np.int64).reshape(-1, 3)
+            order = np.argsort(arr[:, 0], kind="stable")
+
+            self.timestamps[section] = arr[order, 0]
+            self.starts[section] = arr[order, 1]
+            self.ends[section] = arr[order, 2]
+
+    def seek(self, timestamp: int) -> LogTick:
+        return next(self.iter_range(timestamp, timestamp), LogTick(timestamp, [], [], []))
+
+    def iter_range(self, start_timestamp: int, end_timestamp: int) -> Iterator[LogTick]:
+        # Yields the ticks with a timestamp in [start_timestamp, end_timestamp], only decoding the records of these ticks
+        chunks = {}
+        with self.file.open("rb") as fd:
+            for section in self.SECTIONS:
+                lo = np.searchsorted(self.timestamps[section], start_timestamp, side="left")
+                hi = np.searchsorted(self.timestamps[section], end_timestamp, side="right")
+
+                chunks[section] = []
+                for i in range(lo, hi):
+                    fd.seek(self.starts[section][i])
+                    chunks[section].append((int(self.timestamps[section][i]), fd.read(self.ends[section][i] - self.starts[section][i]).decode("utf-8")))
+
+        ticks = {}
+        for section, section_chunks in chunks.items():
+            for timestamp, chunk in section_chunks:
+                tick = ticks.setdefault(timestamp, LogTick(timestamp, [], [], []))
+                if section == "sandbox":
+                    tick.sandbox_logs.append(parse_sandbox_log(json.loads(chunk)))
+                elif section == "activities":
+                    tick.activities.append(parse_activity(dict(zip(self.activities_header, chunk.strip().split(";")))))
+                else:
+                    tick.trades.append(parse_trade(json.loads(chunk)))
+
+        for timestamp in sorted(ticks):
+            yield ticks[timestamp]
+
+def seek(file: Path, timestamp: int) -> LogTick:
+    return LogIndex(file).seek(timestamp)
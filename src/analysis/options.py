@@ -0,0 +1,246 @@
+import math
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from catalog import Catalog
+from features import get_features
+from typing import Callable
+
+# The coconut coupon parameters used by CoconutCouponStrategy
+STRIKE_PRICE = 10_000
+EXPIRATION_TIME = 245 / 365
+RISK_FREE_RATE = 0
+VOLATILITY = 0.193785
+
+# Coefficients of W. J. Cody's rational approximations of erf and erfc ("Rational Chebyshev approximations for the error function", 1969)
+# for |x| <= 0.46875, 0.46875 < |x| <= 4 and |x| > 4, as in his CALERF routine
+ERF_A = (3.16112374387056560e00, 1.13864154151050156e02, 3.77485237685302021e02, 3.20937758913846947e03, 1.85777706184603153e-1)
+ERF_B = (2.36012909523441209e01, 2.44024637934444173e02, 1.28261652607737228e03, 2.84423683343917062e03)
+ERF_C = (
+    5.64188496988670089e-1, 8.88314979438837594e00, 6.61191906371416295e01, 2.98635138197400131e02, 8.81952221241769090e02,
+    1.71204761263407058e03, 2.05107837782607147e03, 1.23033935479799725e03, 2.15311535474403846e-8,
+)
+ERF_D = (
+    1.57449261107098347e01, 1.17693950891312499e02, 5.37181101862009858e02, 1.62138957456669019e03, 3.29079923573345963e03,
+    4.36261909014324716e03, 3.43936767414372164e03, 1.23033935480374942e03,
+)
+ERF_P = (3.05326634961232344e-1, 3.60344899949804439e-1, 1.25781726111229246e-1, 1.60837851487422766e-2, 6.58749161529837803e-4, 1.63153871373020978e-2)
+ERF_Q = (2.56852019228982242e00, 1.87295284992346725e00, 5.27905102951428412e-1, 6.05183413124413191e-2, 2.33520497626869185e-3)
+
+# math.erf applied elementwise, this is a Python call per element but matches statistics.NormalDist as used by the strategy to the last bit
+exact_erf = np.frompyfunc(math.erf, 1, 1)
+
+@dataclass
+class OptionPrices:
+    # float64 arrays with the broadcast shape of the inputs, theta is per year
+    price: np.ndarray
+    delta: np.ndarray
+    gamma: np.ndarray
+    vega: np.ndarray
+    theta: np.ndarray
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({name: np.ravel(getattr(self, name)) for name in ["price", "delta", "gamma", "vega", "theta"]})
+
+def erf(x: np.ndarray | float) -> np.ndarray:
+    # Vectorized erf, within a few units in the last place of math.erf but not always equal to it
+    x = np.asarray(x, dtype=np.float64)
+    y = np.abs(x)
+    result = np.empty_like(x)
+
+    small = y <= 0.46875
+    ysq = y[small] ** 2
+    numerator = ERF_A[4] * ysq
+    denominator = ysq
+    for a, b in zip(ERF_A[:3], ERF_B[:3]):
+        numerator = (numerator + a) * ysq
+        denominator = (denominator + b) * ysq
+
+    result[small] = x[small] * (numerator + ERF_A[3]) / (denominator + ERF_B[3])
+
+    # erfc underflows to 0 beyond 27, clipping keeps infinite inputs from turning into nan
+    large = ~small
+    y_large = np.minimum(y[large], 27)
+    erfc = np.empty_like(y_large)
+
+    medium = y_large <= 4
+    y_medium = y_large[medium]
+    numerator = ERF_C[8] * y_medium
+    denominator = y_medium
+    for c, d in zip(ERF_C[:7], ERF_D[:7]):
+        numerator = (numerator + c) * y_medium
+        denominator = (denominator + d) * y_medium
+
+    erfc[medium] = (numerator + ERF_C[7]) / (denominator + ERF_D[7])
+
+    tail = ~medium
+    inverse_square = 1 / y_large[tail] ** 2
+    numerator = ERF_P[5] * inverse_square
+    denominator = inverse_square
+    for p, q in zip(ERF_P[:4], ERF_Q[:4]):
+        numerator = (numerator + p) * inverse_square
+        denominator = (denominator + q) * inverse_square
+
+    erfc[tail] = (1 / math.sqrt(math.pi) - inverse_square * (numerator + ERF_P[4]) / (denominator + ERF_Q[4])) / y_large[tail]
+
+    # exp(-y^2) is split into two factors to keep the rounding error of y^2 out of the exponent
+    rounded = np.trunc(y_large * 16) / 16
+    erfc *= np.exp(-rounded * rounded) * np.exp(-(y_large - rounded) * (y_large + rounded))
+
+    result[large] = np.copysign(0.5 - erfc + 0.5, x[large])
+    return result
+
+def norm_cdf(x: np.ndarray, exact: bool = False) -> np.ndarray:
+    # With exact=True the values match statistics.NormalDist to the last bit, at the cost of a Python call per element
+    if exact:
+        return 0.5 * (1.0 + np.asarray(exact_erf(x / math.sqrt(2.0)), dtype=np.float64))
+
+    return 0.5 * (1.0 + erf(x / math.sqrt(2.0)))
+
+def norm_pdf(x: np.ndarray) -> np.ndarray:
+    return np.exp(-x ** 2 / 2) / math.sqrt(2 * math.pi)
+
+def black_scholes(
+    asset_price: np.ndarray | float,
+    strike_price: np.ndarray | float = STRIKE_PRICE,
+    expiration_time: np.ndarray | float = EXPIRATION_TIME,
+    risk_free_rate: np.ndarray | float = RISK_FREE_RATE,
+    volatility: np.ndarray | float = VOLATILITY,
+    exact: bool = False,
+) -> OptionPrices:
+    asset_price, strike_price, expiration_time, risk_free_rate, volatility = np.broadcast_arrays(
+        *[np.asarray(value, dtype=np.float64) for value in [asset_price, strike_price, expiration_time, risk_free_rate, volatility]],
+    )
+
+    # Same operations in the same order as CoconutCouponStrategy.black_scholes, so with exact=True the prices match it to the last bit
+    sqrt_time = np.sqrt(expiration_time)
+    d1 = (np.log(asset_price / strike_price) + (risk_free_rate + volatility ** 2 / 2) * expiration_time) / (volatility * sqrt_time)
+    d2 = d1 - volatility * sqrt_time
+
+    discounted_strike = strike_price * np.exp(-risk_free_rate * expiration_time)
+    cdf_d1 = norm_cdf(d1, exact)
+    cdf_d2 = norm_cdf(d2, exact)
+    pdf_d1 = norm_pdf(d1)
+
+    return OptionPrices(
+        asset_price * cdf_d1 - discounted_strike * cdf_d2,
+        cdf_d1,
+        pdf_d1 / (asset_price * volatility * sqrt_time),
+        asset_price * pdf_d1 * sqrt_time,
+        -asset_price * pdf_d1 * volatility / (2 * sqrt_time) - risk_free_rate * discounted_strike * cdf_d2,
+    )
+
+def get_coupon_prices(round_num: int, day_num: int, volatility: np.ndarray | float = VOLATILITY) -> pd.DataFrame:
+    # Theoretical coupon values and greeks for every tick of a day, next to the mid prices the strategy sees
+    features = get_features(round_num, day_num)
+    coconut = features.get_product("COCONUT")
+    coupon = features.get_product("COCONUT_COUPON")
+
+    prices = black_scholes(coconut["popular_mid_price"].to_numpy(), volatility=volatility).to_frame()
+    prices.insert(0, "timestamp", features.timestamps)
+    prices.insert(1, "coconut_mid_price", coconut["popular_mid_price"].to_numpy())
+    prices.insert(2, "coupon_mid_price", coupon["popular_mid_price"].to_numpy())
+
+    return prices
+
+def implied_volatility(
+    option_price: np.ndarray | float,
+    asset_price: np.ndarray | float,
+    strike_price: np.ndarray | float = STRIKE_PRICE,
+    expiration_time: np.ndarray | float = EXPIRATION_TIME,
+    risk_free_rate: np.ndarray | float = RISK_FREE_RATE,
+    tolerance: float = 1e-6,
+    max_iterations: int = 50,
+) -> np.ndarray:
+    option_price, asset_price, strike_price, expiration_time, risk_free_rate = np.broadcast_arrays(
+        *[np.asarray(value, dtype=np.float64) for value in [option_price, asset_price, strike_price, expiration_time, risk_free_rate]],
+    )
+
+    # The solver works on flat arrays, the result gets the broadcast shape of the inputs
+    shape = option_price.shape
+    option_price, asset_price, strike_price, expiration_time, risk_free_rate = [
+        np.ravel(value) for value in [option_price, asset_price, strike_price, expiration_time, risk_free_rate]
+    ]
+
+    # Prices outside the no-arbitrage bounds have no implied volatility
+    lower_bound = np.maximum(asset_price - strike_price * np.exp(-risk_free_rate * expiration_time), 0)
+    valid = (option_price > lower_bound) & (option_price < asset_price)
+
+    # Brenner-Subrahmanyam approximation, which is close for near the money options like the coupon
+    volatility = np.where(valid, np.sqrt(2 * math.pi / expiration_time) * option_price / asset_price, np.nan)
+
+    # The price is increasing in volatility, so every evaluation narrows a bracket around the root
+    # Newton steps that leave the bracket are replaced by bisection steps, while there is no upper bound yet
+    # the volatility is at most doubled, since vega vanishes for far out of the money prices
+    low = np.zeros_like(volatility)
+    high = np.full_like(volatility, np.inf)
+    active = valid.copy()
+
+    for _ in range(max_iterations):
+        if not active.any():
+            break
+
+        prices = black_scholes(asset_price[active], strike_price[active], expiration_time[active], risk_free_rate[active], volatility[active])
+        error = prices.price - option_price[active]
+
+        current = volatility[active]
+        low[active] = np.where(error < 0, current, low[active])
+        high[active] = np.where(error > 0, current, high[active])
+
+        with np.errstate(divide="ignore", over="ignore", invalid="ignore"):
+            step = current - error / prices.vega
+
+        bisection = np.where(np.isinf(high[active]), 2 * current, (low[active] + high[active]) / 2)
+        in_bracket = (step > low[active]) & (step < np.minimum(high[active], 2 * current))
+        volatility[active] = np.where(in_bracket, step, bisection)
+
+        converged = np.abs(error) < tolerance
+        indices = np.flatnonzero(active)
+        volatility[indices[converged]] = current[converged]
+        active[indices[converged]] = False
+
+    # Ticks that did not converge within max_iterations have no reliable solution
+    volatility[active] = np.nan
+    return volatility.reshape(shape)
+
+def get_expiration_time(day_num: int, first_day_num: int, expiration_time: float = EXPIRATION_TIME) -> float:
+    # Time to expiry in years on the given day, when it is expiration_time on the first day and shrinks by a day per day
+    return expiration_time - (day_num - first_day_num) / 365
+
+def get_implied_volatilities(
+    round_num: int = 4,
+    day_nums: list[int] | None = None,
+    expiration_time: float | dict[int, float] | Callable[[int], float] | None = None,
+) -> pd.DataFrame:
+    # Per-tick implied volatility of the coupon over all days of a round, solved for all ticks at once
+    # expiration_time is the time to expiry per day, either fixed, per day number or as a function of the day number,
+    # by default EXPIRATION_TIME holds on the round's first day and every later day is one day closer to expiry
+    round_day_nums = dict(Catalog().get_spec())[round_num]
+    if day_nums is None:
+        day_nums = round_day_nums
+
+    if expiration_time is None:
+        first_day_num = min(round_day_nums)
+        get_day_expiration_time = lambda day_num: get_expiration_time(day_num, first_day_num)
+    elif isinstance(expiration_time, dict):
+        get_day_expiration_time = expiration_time.__getitem__
+    elif callable(expiration_time):
+        get_day_expiration_time = expiration_time
+    else:
+        get_day_expiration_time = lambda day_num: expiration_time
+
+    days = []
+    for day_num in day_nums:
+        prices = get_coupon_prices(round_num, day_num)[["timestamp", "coconut_mid_price", "coupon_mid_price"]]
+        prices.insert(0, "day", day_num)
+        prices.insert(2, "expiration_time", get_day_expiration_time(day_num))
+        days.append(prices)
+
+    prices = pd.concat(days, ignore_index=True)
+    prices["implied_volatility"] = implied_volatility(
+        prices["coupon_mid_price"].to_numpy(),
+        prices["coconut_mid_price"].to_numpy(),
+        expiration_time=prices["expiration_time"].to_numpy(),
+    )
+
+    return prices
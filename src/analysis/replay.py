@@ -0,0 +1,177 @@
+import compactdatamodel
+import contextlib
+import datamodel
+import importlib.util
+import io
+import json
+import numpy as np
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datamodel import Symbol, Trade, TradingState
+from decoder import expand_delta_payloads
+from logs import iter_sandbox_logs
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Iterator
+
+SRC_ROOT = Path(__file__).parent.parent
+
+@dataclass
+class LoggedTick:
+    state: TradingState
+    orders: list[tuple[Symbol, int, int]]
+    conversions: int
+    trader_data: str
+
+@dataclass
+class TickMismatch:
+    timestamp: int
+    expected_orders: list[tuple[Symbol, int, int]]
+    actual_orders: list[tuple[Symbol, int, int]]
+    expected_conversions: int
+    actual_conversions: int
+
+@dataclass
+class ReplayResult:
+    timestamps: np.ndarray
+    latencies_ns: np.ndarray
+    mismatches: list[TickMismatch] = field(default_factory=list)
+
+    def latency_percentiles(self, percentiles: tuple[float, ...] = (50, 90, 99, 100)) -> dict[float, float]:
+        return {percentile: np.percentile(self.latencies_ns, percentile) / 1e6 for percentile in percentiles}
+
+    def __str__(self) -> str:
+        latencies = ", ".join(f"p{percentile:g} {ms:.3f}ms" for percentile, ms in self.latency_percentiles().items())
+        return f"{len(self.timestamps)} ticks, {len(self.mismatches)} mismatches, mean {self.latencies_ns.mean() / 1e6:.3f}ms, {latencies}"
+
+@dataclass
+class MemoryUsage:
+    blocks: int
+    bytes: int
+
+    def __str__(self) -> str:
+        return f"{self.blocks:,} blocks, {self.bytes / 1024 ** 2:.2f} MiB"
+
+def get_model(compact: bool) -> ModuleType:
+    return compactdatamodel if compact else datamodel
+
+def load_trader_class(file: Path, model: ModuleType = datamodel) -> type:
+    # Algorithm files import datamodel as a top-level module, which resolves to the given model while the file is loaded
+    spec = importlib.util.spec_from_file_location(f"replayed_{file.stem.replace('-', '_')}_{model.__name__}", file)
+    module = importlib.util.module_from_spec(spec)
+
+    original_model = sys.modules.get("datamodel")
+    sys.modules["datamodel"] = model
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        sys.modules["datamodel"] = original_model
+
+    return module.Trader
+
+def iter_logged_ticks(file: Path, model: ModuleType = datamodel) -> Iterator[LoggedTick]:
+    for compressed_state, compressed_orders, conversions, trader_data, _ in expand_delta_payloads(iter_payloads(file)):
+        yield LoggedTick(
+            decompress_state(compressed_state, model),
+            [(symbol, price, quantity) for symbol, price, quantity in compressed_orders],
+            conversions,
+            trader_data,
+        )
+
+def iter_payloads(file: Path) -> Iterator[list[Any]]:
+    for record in iter_sandbox_logs(file):
+        if record.lambda_log.startswith("["):
+            yield json.loads(record.lambda_log)
+
+def decompress_state(compressed: list[Any], model: ModuleType = datamodel) -> TradingState:
+    timestamp, trader_data, listings, order_depths, own_trades, market_trades, position, observations = compressed
+
+    depths = {}
+    for symbol, (buy_orders, sell_orders) in order_depths.items():
+        depth = model.OrderDepth()
+        depth.buy_orders = {int(price): volume for price, volume in buy_orders.items()}
+        depth.sell_orders = {int(price): volume for price, volume in sell_orders.items()}
+        depths[symbol] = depth
+
+    plain_observations, conversion_observations = observations
+
+    return model.TradingState(
+        trader_data,
+        timestamp,
+        # The exchange passes listings as plain dicts, which is what Logger.compress_listings expects
+        {symbol: {"symbol": symbol, "product": product, "denomination": denomination} for symbol, product, denomination in listings},
+        depths,
+        decompress_trades(own_trades, model),
+        decompress_trades(market_trades, model),
+        position,
+        model.Observation(plain_observations, {product: model.ConversionObservation(*values) for product, values in conversion_observations.items()}),
+    )
+
+def decompress_trades(compressed: list[list[Any]], model: ModuleType = datamodel) -> dict[Symbol, list[Trade]]:
+    trades = {}
+    for symbol, price, quantity, buyer, seller, timestamp in compressed:
+        trades.setdefault(symbol, []).append(model.Trade(symbol, price, quantity, buyer, seller, timestamp))
+
+    return trades
+
+def replay(trader_file: Path, log_file: Path, logged_trader_data: bool = True, silent: bool = True, compact: bool = False) -> ReplayResult:
+    # With compact=True both the replayed states and the objects the trader creates use the __slots__ datamodel
+    model = get_model(compact)
+    trader = load_trader_class(trader_file, model)()
+    ticks = list(iter_logged_ticks(log_file, model))
+
+    timestamps = np.zeros(len(ticks), dtype=np.int32)
+    latencies_ns = np.zeros(len(ticks), dtype=np.int64)
+    result = ReplayResult(timestamps, latencies_ns)
+
+    # With logged_trader_data=False each tick gets the trader data the replayed trader returned on the previous tick,
+    # which is needed when the logged trader data was truncated or the trader's format differs from the logged one
+    trader_data = ""
+
+    output = io.StringIO() if silent else None
+    with contextlib.redirect_stdout(output) if silent else contextlib.nullcontext():
+        for i, tick in enumerate(ticks):
+            if not logged_trader_data:
+                tick.state.traderData = trader_data
+
+            start = time.perf_counter_ns()
+            orders, conversions, trader_data = trader.run(tick.state)
+            latencies_ns[i] = time.perf_counter_ns() - start
+            timestamps[i] = tick.state.timestamp
+
+            actual_orders = sorted((order.symbol, order.price, order.quantity) for arr in orders.values() for order in arr)
+            expected_orders = sorted(tick.orders)
+            if actual_orders != expected_orders or conversions != tick.conversions:
+                result.mismatches.append(TickMismatch(tick.state.timestamp, expected_orders, actual_orders, tick.conversions, conversions))
+
+            if silent:
+                output.seek(0)
+                output.truncate()
+
+    return result
+
+def measure_memory(trader_file: Path, log_file: Path, compact: bool = False) -> MemoryUsage:
+    # Measures the objects a simulated day keeps alive, the states of all ticks and the orders the trader returned for them
+    model = get_model(compact)
+    trader = load_trader_class(trader_file, model)()
+    payloads = list(expand_delta_payloads(iter_payloads(log_file)))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracemalloc.start()
+        try:
+            retained = []
+            for payload in payloads:
+                state = decompress_state(payload[0], model)
+                retained.append((state, trader.run(state)[0]))
+
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+
+    # Only the allocations made by the datamodel and the algorithm count, this leaves out the JSON parsing and tracemalloc itself
+    files = [model.__file__, str(trader_file), __file__]
+    statistics = snapshot.filter_traces([tracemalloc.Filter(True, file) for file in files]).statistics("filename")
+
+    return MemoryUsage(sum(stat.count for stat in statistics), sum(stat.size for stat in statistics))
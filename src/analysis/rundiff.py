@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from decoder import DecodedLog, decode_log
+from logs import read_activities
+from pathlib import Path
+
+@dataclass
+class RunDiff:
+    timestamps: np.ndarray
+    products: list[str]
+
+    # Arrays indexed by (timestamp, product), "a" and "b" refer to the first and second log
+    orders_differ: np.ndarray
+    buy_quantity_a: np.ndarray
+    buy_quantity_b: np.ndarray
+    sell_quantity_a: np.ndarray
+    sell_quantity_b: np.ndarray
+    position_a: np.ndarray
+    position_b: np.ndarray
+    pnl_a: np.ndarray
+    pnl_b: np.ndarray
+
+    @property
+    def pnl_delta(self) -> np.ndarray:
+        return self.pnl_b - self.pnl_a
+
+    @property
+    def position_delta(self) -> np.ndarray:
+        return self.position_b - self.position_a
+
+    def first_divergence(self) -> tuple[int, str] | None:
+        ticks, products = np.nonzero(self.orders_differ)
+        if len(ticks) == 0:
+            return None
+
+        return int(self.timestamps[ticks[0]]), self.products[products[0]]
+
+    def summary(self) -> pd.DataFrame:
+        def first_timestamp(mask: np.ndarray) -> np.ndarray:
+            return np.where(mask.any(axis=0), self.timestamps[mask.argmax(axis=0)], -1)
+
+        return pd.DataFrame({
+            "ticks_with_different_orders": self.orders_differ.sum(axis=0),
+            "first_order_divergence": first_timestamp(self.orders_differ),
+            "first_position_divergence": first_timestamp(self.position_delta != 0),
+            "final_pnl_a": self.pnl_a[-1],
+            "final_pnl_b": self.pnl_b[-1],
+            "final_pnl_delta": self.pnl_delta[-1],
+            "max_abs_pnl_delta": np.abs(self.pnl_delta).max(axis=0),
+        }, index=pd.Index(self.products, name="product"))
+
+def diff_runs(file_a: Path, file_b: Path) -> RunDiff:
+    log_a = decode_log(file_a)
+    log_b = decode_log(file_b)
+    pnl_frame_a = get_pnl_frame(file_a)
+    pnl_frame_b = get_pnl_frame(file_b)
+
+    timestamps = np.union1d(log_a.timestamps, log_b.timestamps)
+    products = sorted(set(pnl_frame_a["product"]) | set(pnl_frame_b["product"]) | set(log_a.orders["symbol"]) | set(log_b.orders["symbol"]))
+
+    orders_a = get_order_frame(log_a)
+    orders_b = get_order_frame(log_b)
+
+    return RunDiff(
+        timestamps,
+        products,
+        get_order_mismatches(orders_a, orders_b, timestamps, products),
+        *get_side_quantities(orders_a, timestamps, products),
+        *get_side_quantities(orders_b, timestamps, products),
+        get_positions(log_a, timestamps, products),
+        get_positions(log_b, timestamps, products),
+        to_dense(pnl_frame_a, "profit_and_loss", timestamps, products, forward_fill=True),
+        to_dense(pnl_frame_b, "profit_and_loss", timestamps, products, forward_fill=True),
+    )
+
+def get_order_frame(log: DecodedLog) -> pd.DataFrame:
+    return pd.DataFrame({
+        "timestamp": log.timestamps[log.orders["tick"].to_numpy()],
+        "product": log.orders["symbol"].astype(str).to_numpy(),
+        "price": log.orders["price"].to_numpy(),
+        "quantity": log.orders["quantity"].to_numpy(),
+    })
+
+def get_pnl_frame(file: Path) -> pd.DataFrame:
+    return read_activities(file)[["timestamp", "product", "profit_and_loss"]]
+
+def to_dense(frame: pd.DataFrame, column: str, timestamps: np.ndarray, products: list[str], forward_fill: bool = False) -> np.ndarray:
+    values = np.full((len(timestamps), len(products)), np.nan if forward_fill else 0, dtype=np.float64)
+
+    rows = np.searchsorted(timestamps, frame["timestamp"].to_numpy())
+    columns = pd.Index(products).get_indexer(frame["product"])
+    values[rows, columns] = frame[column].to_numpy()
+
+    if forward_fill:
+        values = pd.DataFrame(values).ffill().fillna(0).to_numpy()
+
+    return values
+
+def get_order_mismatches(orders_a: pd.DataFrame, orders_b: pd.DataFrame, timestamps: np.ndarray, products: list[str]) -> np.ndarray:
+    # Orders are compared as multisets of (price, quantity) per (timestamp, product), independent of their order in the log
+    keys = ["timestamp", "product", "price", "quantity"]
+    counts = pd.merge(
+        orders_a.value_counts(keys).rename("count_a").reset_index(),
+        orders_b.value_counts(keys).rename("count_b").reset_index(),
+        on=keys,
+        how="outer",
+    ).fillna(0)
+
+    mismatches = counts[counts["count_a"] != counts["count_b"]]
+
+    mask = np.zeros((len(timestamps), len(products)), dtype=bool)
+    mask[np.searchsorted(timestamps, mismatches["timestamp"].to_numpy()), pd.Index(products).get_indexer(mismatches["product"])] = True
+    return mask
+
+def get_side_quantities(orders: pd.DataFrame, timestamps: np.ndarray, products: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    buys = orders[orders["quantity"] > 0].groupby(["timestamp", "product"], as_index=False)["quantity"].sum()
+    sells = orders[orders["quantity"] < 0].groupby(["timestamp", "product"], as_index=False)["quantity"].sum()
+    sells["quantity"] = -sells["quantity"]
+
+    return to_dense(buys, "quantity", timestamps, products), to_dense(sells, "quantity", timestamps, products)
+
+def get_positions(log: DecodedLog, timestamps: np.ndarray, products: list[str]) -> np.ndarray:
+    positions = pd.DataFrame({
+        "timestamp": log.timestamps[log.positions["tick"].to_numpy()],
+        "product": log.positions["symbol"].astype(str).to_numpy(),
+        "position": log.positions["position"].to_numpy(),
+    })
+
+    # Logged positions are the positions at the start of each tick, symbols without a position are left out
+    dense = np.zeros((len(timestamps), len(products)), dtype=np.int32)
+    logged = np.zeros(len(timestamps), dtype=bool)
+    logged[np.searchsorted(timestamps, log.timestamps)] = True
+
+    dense[np.searchsorted(timestamps, positions["timestamp"].to_numpy()), pd.Index(products).get_indexer(positions["product"])] = positions["position"].to_numpy()
+
+    # Ticks missing from this log keep the previous tick's position
+    for i in np.nonzero(~logged)[0]:
+        if i > 0:
+            dense[i] = dense[i - 1]
+
+    return dense
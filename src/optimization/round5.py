@@ -2,7 +2,7 @@ import itertools
 import json
 import numpy as np
 from abc import abstractmethod
-from datamodel import Order, OrderDepth, Symbol, TradingState
+from datamodel import Order, OrderDepth, Symbol, Trade, TradingState
 from enum import IntEnum
 from pathlib import Path
 from prosperity2bt.data import read_day_data
@@ -13,6 +13,14 @@ from typing import TypeAlias
 
 JSON: TypeAlias = dict[str, "JSON"] | list["JSON"] | str | int | float | bool | None
 
+class TradeIndex:
+    # Market trades keyed by (symbol, timestamp, buyer, seller), built once per tick and shared by all strategies
+    def __init__(self, market_trades: dict[Symbol, list[Trade]]) -> None:
+        self.keys = {(symbol, trade.timestamp, trade.buyer, trade.seller) for symbol, arr in market_trades.items() for trade in arr}
+
+    def contains(self, symbol: Symbol, timestamp: int, buyer: str, seller: str) -> bool:
+        return (symbol, timestamp, buyer, seller) in self.keys
+
 class Strategy:
     def __init__(self, symbol: str, limit: int) -> None:
         self.symbol = symbol
@@ -22,9 +30,10 @@ class Strategy:
     def act(self, state: TradingState) -> None:
         raise NotImplementedError()
 
-    def run(self, state: TradingState) -> tuple[list[Order], int]:
+    def run(self, state: TradingState, trade_index: TradeIndex) -> tuple[list[Order], int]:
         self.orders = []
         self.conversions = 0
+        self.trade_index = trade_index
 
         self.act(state)
 
@@ -110,13 +119,10 @@ class MyStrategy(SignalStrategy):
         self.seller2 = seller2
 
     def get_signal(self, state: TradingState) -> Signal | None:
-        trades = state.market_trades.get(self.symbol, [])
-        trades = [t for t in trades if t.timestamp == state.timestamp - 100]
-
-        if any(t.buyer == self.buyer1 and t.seller == self.seller1 for t in trades):
+        if self.trade_index.contains(self.symbol, state.timestamp - 100, self.buyer1, self.seller1):
             return Signal.LONG
 
-        if any(t.buyer == self.buyer2 and t.seller == self.seller2 for t in trades):
+        if self.trade_index.contains(self.symbol, state.timestamp - 100, self.buyer2, self.seller2):
             return Signal.SHORT
 
 class Trader:
@@ -143,9 +149,11 @@ class Trader:
         conversions = 0
         trader_data = ""
 
+        trade_index = TradeIndex(state.market_trades)
+
         for symbol, strategy in self.strategies.items():
             if symbol in state.order_depths and len(state.order_depths[symbol].buy_orders) > 0 and len(state.order_depths[symbol].sell_orders) > 0:
-                strategy_orders, strategy_conversions = strategy.run(state)
+                strategy_orders, strategy_conversions = strategy.run(state, trade_index)
                 orders[symbol] = strategy_orders
                 conversions += strategy_conversions
 